@@ -1,4 +1,5 @@
 import streamlit as st
+import fonctiuns_project as f
 
 st.set_page_config(
     page_title="Analyse d\'indices",
@@ -27,9 +28,14 @@ Cette application vous permet d'analyser différents indices boursiers.
 - Momentum 6 months
 - Géographique
             
-Attention : - les premiers graphiques peuvent prendre un peu de temps à s'afficher, merci de patienter.
+Attention : - les graphiques des configurations peu consultées peuvent prendre un peu de temps à s'afficher la première fois, merci de patienter.
             - s'assurer de sélectionner le bon unnivers d'investissement avant de choisir le pays pour l'indice géographique.
 
 
 Commencez par la page de sélection pour paramétrer votre analyse.
 """)
+
+# Avancement du préchauffage des configurations les plus consultées (lancé au démarrage de l'application)
+done, failed, total = f.get_warmup_status()
+if total and done + failed < total:
+    st.caption(f"Préparation des indices les plus consultés en arrière-plan : {done}/{total} prêts.")
@@ -0,0 +1,101 @@
+"""
+Benchmark de la latence d'un rerun de la page de visualisation.
+
+Compare l'ancienne mise en cache par @st.cache_data (hachage des dataframes passés en arguments à chaque appel)
+avec le cache par clés simples de fonctiuns_project (ticker, année, paramètres de stratégie).
+Les données sont synthétiques : un classeur factice et son cache Parquet sont créés dans un répertoire temporaire
+(voir synthetique.py).
+
+Utilisation : python benchmarks/bench_cache.py --tickers 500 --years 12
+"""
+
+import argparse
+import inspect
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import streamlit as st
+
+from synthetique import make_synthetic_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fonctiuns_project as f
+
+
+# Fonction qui reproduit le pipeline High vol PER de la page avec les fonctions décorées par @st.cache_data
+def run_st_cache_data_page(cached):
+    df_prices = cached["get_df_prices"]("SPX")
+    df_index_values = []
+    for year in range(f.START_YEAR, 2022):
+        interval = [2010, year - 1] if year == f.START_YEAR else [year - 1, year - 1]
+        df_lookback = cached["get_prices_series"](df_prices, interval)
+        df_qualitative = cached["get_df_qualitative"]("SPX", year - 1)
+
+        df_volatility = cached["calculate_volatility"](cached["calculate_daily_returns"](df_lookback))
+        df_high_vol = cached["get_percentile"](df_volatility, 0.4)
+        df_high_per = cached["get_percentile"](cached["get_indicator_data_num"](df_qualitative, "PE_RATIO"), 0.7)
+        stocks_index = cached["get_intersection"](df_high_vol, df_high_per)
+        df_capitalization = f.reduce_series(cached["get_indicator_data_num"](df_qualitative, "CUR_MKT_CAP"), stocks_index)
+        df_weights = cached["calculate_weights"](df_capitalization)
+
+        df_values = cached["index_tracking"](cached["get_prices_series"](df_prices, [year, year]), df_weights)
+        if df_index_values:
+            df_values = cached["continuity_index"](df_values, df_index_values[-1])
+        df_index_values.append(df_values)
+
+    return cached["aggregate_series"](*df_index_values)
+
+
+# Fonction qui reproduit le pipeline High vol PER de la page avec le cache par clés simples
+def run_key_cache_page():
+    df_index_values, df_weights_periods = f.get_index_values("SPX", "High vol PER")
+
+    return df_index_values
+
+
+# Fonction qui mesure la durée moyenne d'un appel en millisecondes
+def timeit(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--years", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # Streamlit signale l'absence de runtime à chaque appel en dehors de "streamlit run"
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    names = [
+        "get_df_prices", "get_df_qualitative", "get_prices_series", "calculate_daily_returns",
+        "calculate_volatility", "get_percentile", "get_indicator_data_num", "get_intersection",
+        "calculate_weights", "index_tracking", "continuity_index", "aggregate_series"
+    ]
+    cached = {name: st.cache_data(inspect.unwrap(getattr(f, name))) for name in names}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        make_synthetic_workbook(args.tickers, args.years)
+
+        cold_before = timeit(lambda: run_st_cache_data_page(cached), 1)
+        rerun_before = timeit(lambda: run_st_cache_data_page(cached), args.repeat)
+        cold_after = timeit(run_key_cache_page, 1)
+        rerun_after = timeit(run_key_cache_page, args.repeat)
+
+    print(f"Panel : {args.tickers} titres x {252 * args.years} dates")
+    print(f"{'':<24}{'premier appel':>16}{'rerun':>12}")
+    print(f"{'@st.cache_data':<24}{cold_before:>13.1f} ms{rerun_before:>9.2f} ms")
+    print(f"{'cache par clés':<24}{cold_after:>13.1f} ms{rerun_after:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Benchmark des étapes du calcul des indices et des stratégies complètes sur des univers synthétiques.
+
+Chaque étape (chargement des prix et des données qualitatives, index_tracking, filter_qualitative_by_country,
+get_percentile + get_intersection, convert_prices, calculer_indicateurs) puis chaque stratégie de bout en bout
+(caches vidés, du cache Parquet jusqu'aux valeurs de l'indice) est mesurée pour chaque taille d'univers : meilleure
+durée sur plusieurs répétitions et pic de mémoire allouée (tracemalloc). Les données sont générées hors ligne dans un
+répertoire temporaire (voir synthetique.py).
+
+Les résultats peuvent être enregistrés en json (--out) et comparés à ceux d'une version précédente (--compare) : le
+script se termine en erreur si une étape est plus lente que la référence au-delà de la tolérance.
+
+Utilisation : python benchmarks/bench_pipeline.py --sizes 500x10,2000x20 --out bench.json
+              python benchmarks/bench_pipeline.py --sizes 500x10,2000x20 --compare bench.json --tolerance 0.2
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from synthetique import make_synthetic_workbook, clear_caches
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import moteur_indices as mi
+
+# Univers et pays utilisés pour les données synthétiques
+TICKER = "SPX"
+COUNTRY = "FRANCE"
+
+
+# Fonction qui lit une taille d'univers écrite "titres x années" (par exemple 2000x20)
+def parse_size(size):
+    n_tickers, n_years = size.lower().split("x")
+
+    return int(n_tickers), int(n_years)
+
+
+# Fonction qui renvoie les étapes mesurées : nom et fonction de préparation (non mesurée) qui renvoie l'appel mesuré
+def get_stages(frequency=None):
+
+    def cold(func):
+        # Étape mesurée à partir de caches vides
+        def prepare():
+            clear_caches()
+            return func
+        return prepare
+
+    def prices_loaded(func):
+        # Étape mesurée à partir de caches vides, une fois les prix lus
+        def prepare():
+            clear_caches()
+            mi.get_df_prices(TICKER)
+            return func
+        return prepare
+
+    def get_inputs():
+        df_prices = mi.get_df_prices(TICKER)
+        year = max(mi.get_qualitative_years())
+        df_qualitative = mi.get_df_qualitative(TICKER, year)
+        df_lookback = mi.get_prices_series(df_prices, [year, year])
+        df_weights = mi.calculate_weights(mi.get_indicator_data_num(df_qualitative, "CUR_MKT_CAP"))
+
+        return {
+            "prices": df_prices,
+            "qualitative": df_qualitative,
+            "weights": df_weights,
+            "volatility": mi.calculate_volatility(mi.calculate_daily_returns(df_lookback)),
+            "per": mi.get_indicator_data_num(df_qualitative, "PE_RATIO"),
+            "forex": mi.get_forex_data(),
+            "index": mi.index_tracking(df_prices, df_weights),
+            "reference": mi.get_reference_prices(TICKER).iloc[:, 0],
+        }
+
+    def warm(stage):
+        # Étape mesurée sur des données déjà chargées
+        def prepare():
+            inputs = get_inputs()
+            return lambda: stage(inputs)
+        return prepare
+
+    stages = {
+        "get_df_prices": cold(lambda: mi.get_df_prices(TICKER)),
+        "get_returns_store": prices_loaded(lambda: mi.get_returns_store(TICKER)),
+        "get_df_qualitative": prices_loaded(
+            lambda: [mi.get_df_qualitative(TICKER, year) for year in mi.get_qualitative_years()]
+        ),
+        "index_tracking": warm(lambda inputs: mi.index_tracking(inputs["prices"], inputs["weights"])),
+        "filter_qualitative_by_country": warm(
+            lambda inputs: mi.filter_qualitative_by_country(inputs["qualitative"], COUNTRY)
+        ),
+        "get_percentile + get_intersection": warm(lambda inputs: mi.get_intersection(
+            mi.get_percentile(inputs["volatility"], 0.4), mi.get_percentile(inputs["per"], 0.7)
+        )),
+        "convert_prices": warm(lambda inputs: mi.convert_prices(inputs["prices"], inputs["forex"], "EUR")),
+        "calculer_indicateurs": warm(lambda inputs: mi.calculer_indicateurs(inputs["index"], inputs["reference"])),
+    }
+
+    # Stratégies complètes, du cache Parquet jusqu'aux valeurs de l'indice
+    for indice in mi.get_indices():
+        country = COUNTRY if indice == "Géographique" else None
+        stages[f"stratégie {indice}"] = cold(
+            lambda indice=indice, country=country: mi.get_index_values(TICKER, indice, country, frequency)
+        )
+
+    return stages
+
+
+# Fonction qui mesure une étape : meilleure durée sur "repeat" appels (en secondes) et pic de mémoire (en Mo)
+def measure(prepare, repeat):
+    durations = []
+    for _ in range(repeat):
+        func = prepare()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    # Pic de mémoire mesuré sur un appel séparé, le suivi des allocations ralentissant les calculs
+    func = prepare()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return min(durations), peak / 1024 ** 2
+
+
+# Fonction qui renvoie la version du code mesurée (commit git) et de l'environnement
+def get_environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+    }
+
+
+# Fonction qui compare les résultats à ceux d'une référence et renvoie les étapes plus lentes que la tolérance
+def compare_results(results, baseline, tolerance):
+    reference = {(r["stage"], r["tickers"], r["years"]): r for r in baseline["results"]}
+    regressions = []
+
+    print(f"\nComparaison avec {baseline['environment'].get('commit')} (tolérance {tolerance:.0%})")
+    for result in results:
+        key = (result["stage"], result["tickers"], result["years"])
+        if key not in reference:
+            continue
+        ratio = result["seconds"] / reference[key]["seconds"]
+        memory_ratio = result["peak_mb"] / max(reference[key]["peak_mb"], 1e-9)
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  <- régression"
+            regressions.append(key)
+        print(f"{result['stage']:<36}{result['tickers']:>7} x {result['years']:<4}"
+              f"durée x{ratio:>6.2f}   mémoire x{memory_ratio:>6.2f}{flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="500x10", help="tailles d'univers titres x années, séparées par des virgules")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", help="étapes à mesurer (toutes par défaut)")
+    parser.add_argument("--frequency", help="fréquence de rebalancement des stratégies (annuelle par défaut)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="fichier json où enregistrer les résultats")
+    parser.add_argument("--compare", help="fichier json de résultats de référence")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="ralentissement toléré par rapport à la référence")
+    args = parser.parse_args()
+
+    stages = get_stages(args.frequency)
+    if args.stages:
+        stages = {name: stages[name] for name in args.stages}
+
+    results = []
+    initial_dir = os.getcwd()
+    for size in args.sizes.split(","):
+        n_tickers, n_years = parse_size(size)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            start = time.perf_counter()
+            make_synthetic_workbook(n_tickers, n_years, seed=args.seed)
+            print(f"\nPanel : {n_tickers} titres x {252 * n_years} dates (généré en {time.perf_counter() - start:.1f} s)")
+            print(f"{'étape':<36}{'durée':>12}{'pic mémoire':>16}")
+
+            for name, prepare in stages.items():
+                seconds, peak_mb = measure(prepare, args.repeat)
+                results.append({
+                    "stage": name, "tickers": n_tickers, "years": n_years, "seconds": seconds, "peak_mb": peak_mb
+                })
+                print(f"{name:<36}{seconds * 1000:>9.1f} ms{peak_mb:>13.1f} Mo")
+
+            clear_caches()
+            os.chdir(initial_dir)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            json.dump({"environment": get_environment(), "results": results}, file, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare_results(results, json.load(file), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Générateur de données synthétiques pour les benchmarks.
+
+Crée un classeur factice et le cache Parquet de ses feuilles (prix de l'univers, feuilles Qualitativ_AAAA, indice de
+référence et Forex) à la taille voulue, sans passer par excel : les prix sont écrits par blocs de dates, ce qui permet
+de générer des panels de 20 000 titres sur 40 ans sans les garder en mémoire. Les feuilles ont le même format que
+celles du classeur du projet, les fonctions de moteur_indices les lisent donc sans modification.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import moteur_indices as mi
+from moteur_indices import backtest, calculs, donnees, ponderations, regles, resultats
+
+# Dernière date des séries synthétiques (les stratégies sont calculées à partir de START_YEAR)
+END_DATE = "2021-12-31"
+
+# Pays et secteurs attribués aux titres
+COUNTRIES = ["UNITED STATES", "FRANCE", "GERMANY", "BRITAIN", "ITALY"]
+SECTORS = ["Information Technology", "Health Care", "Financials", "Energy", "Industrials"]
+
+# Proportion de prix manquants (complétés par la valeur précédente) et de PER non renseignés
+MISSING_PRICES = 0.01
+MISSING_PER = 0.05
+
+
+# Fonction qui écrit les prix d'un univers par blocs de CHUNK_SIZE dates (marche aléatoire géométrique)
+def write_prices(path, dates, tickers, rng):
+    schema = pa.schema(
+        [("Unnamed: 0", pa.int64()), ("Dates", pa.timestamp("ns"))] + [(ticker, pa.float64()) for ticker in tickers]
+    )
+    log_prices = np.log(rng.uniform(10, 500, len(tickers)))
+
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, len(dates), donnees.CHUNK_SIZE):
+            block = dates[start:start + donnees.CHUNK_SIZE]
+            log_returns = rng.normal(0.0002, 0.02, (len(block), len(tickers)))
+            prices = np.exp(log_prices + np.cumsum(log_returns, axis=0))
+            log_prices = np.log(prices[-1])
+            prices[rng.random(prices.shape) < MISSING_PRICES] = np.nan
+
+            columns = [pa.array(np.zeros(len(block), dtype=np.int64)), pa.array(block.values)]
+            columns += [pa.array(prices[:, i]) for i in range(len(tickers))]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=donnees.CHUNK_SIZE)
+
+
+# Fonction qui crée un classeur factice et le cache Parquet de ses feuilles dans le répertoire courant
+def make_synthetic_workbook(n_tickers, n_years, seed=0, ticker="SPX", qualitative_years=None):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=END_DATE, periods=252 * n_years)
+    tickers = [f"T{i} Equity" for i in range(n_tickers)]
+    qualitative_years = qualitative_years or backtest.QUALITATIVE_YEARS
+
+    open(donnees.EXCEL_FILE, "w").close()
+    cache_path = os.path.join(donnees.CACHE_DIR, donnees.get_workbook_key())
+    os.makedirs(cache_path, exist_ok=True)
+
+    write_prices(os.path.join(cache_path, f"{ticker}_PX_LAST.parquet"), dates, tickers, rng)
+
+    # Une feuille de données qualitatives par année
+    for year in qualitative_years:
+        pd.DataFrame({
+            "Ticker": tickers,
+            "NAME": [f"Company {i}" for i in range(n_tickers)],
+            "COUNTRY": rng.choice(COUNTRIES, n_tickers),
+            "GICS_SECTOR_NAME": rng.choice(SECTORS, n_tickers),
+            "PE_RATIO": np.where(rng.random(n_tickers) < MISSING_PER, np.nan, rng.uniform(5, 40, n_tickers)),
+            "CUR_MKT_CAP": rng.lognormal(9, 1.5, n_tickers)
+        }).to_parquet(os.path.join(cache_path, f"{donnees.QUALITATIVE_PREFIX}{year}.parquet"), index=False)
+
+    # Indice de référence et taux de change (valeur d'un euro dans chaque devise)
+    pd.DataFrame({
+        "Dates": dates,
+        f"{ticker} Index": 1000 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, len(dates))))
+    }).to_parquet(os.path.join(cache_path, "Index.parquet"), index=False)
+
+    df_forex = pd.DataFrame({"Unnamed: 0": 0, "Dates": dates})
+    for currency, level in {"USD": 1.15, "GBP": 0.85, "JPY": 130.0, "CNY": 7.8}.items():
+        df_forex["EUR" + currency] = level * np.exp(np.cumsum(rng.normal(0, 0.004, len(dates))))
+    df_forex.to_parquet(os.path.join(cache_path, "Forex.parquet"), index=False)
+
+    open(os.path.join(cache_path, ".complete"), "w").close()
+
+
+# Fonction qui vide les caches en mémoire de moteur_indices (fonctions décorées par cache_by_key)
+def clear_caches():
+    for module in [mi, backtest, calculs, donnees, ponderations, regles, resultats]:
+        for obj in vars(module).values():
+            if callable(getattr(obj, "cache_clear", None)):
+                obj.cache_clear()
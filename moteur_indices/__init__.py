@@ -0,0 +1,83 @@
+"""
+Moteur de calcul des indices, utilisable sans streamlit (scripts, notebooks, tâches planifiées).
+
+Le package est divisé en plusieurs modules:
+- donnees : collecte des données du fichier excel et cache colonnaire
+- calculs : calculs à partir des données collectées (rendements, volatilité, change)
+- indicateurs : indicateurs de performance de nombreuses séries en une passe numpy, indicateurs glissants
+- filtres : filtrage des données pour la création des indices
+- regles : stratégies définies par des règles déclaratives (dictionnaire, json ou yaml)
+- ponderations : schémas de pondération des titres (poids égaux, plafonnés, inverse de la volatilité, covariance)
+- backtest : suivi d'indice et construction sur un calendrier de rebalancement
+- resultats : stockage sur disque des indices calculés
+- robustesse : intervalles de confiance des indicateurs (bootstrap par blocs, répliques perturbées du backtest)
+- sweep : calcul de toutes les combinaisons de paramètres sur plusieurs processus
+- prechauffage : calcul en arrière-plan des configurations les plus consultées au lancement de l'application
+- profilage : mesure de la durée, des appels au cache et de la mémoire de chaque étape (PROFILING=1)
+- cli : ligne de commande (python -m moteur_indices build-index ...)
+"""
+
+from .profilage import (
+    PROFILING, PROFILE_MEMORY, STAGE_STATS, enable_profiling, disable_profiling, is_profiling_enabled, reset_profile,
+    record_stage, record_cache_call, enter_memory_thread, leave_memory_thread, profile_block, profile_stage,
+    get_profile, write_profile_log
+)
+from .donnees import (
+    EXCEL_FILE, CACHE_DIR, CACHE_SIZE, CHUNK_SIZE, COMPACT_PRICES, ERROR_MARKER_PREFIX, NUMERIC_MAJORITY, SOURCE_FILE,
+    get_workbook_key, is_numeric_column, prepare_columnar, is_process_alive, clean_cache_root, ingest_workbook, cache_by_key, read_sheet,
+    get_df_prices, iter_sheet_chunks, iter_df_prices, get_prices_memmap,
+    get_prices_series, get_prices_series_semi, QUALITATIVE_PREFIX, QUALITATIVE_TABLE, QualitativeStore,
+    build_qualitative_table, build_qualitative_store, get_qualitative_store, get_qualitative_years,
+    get_snapshot_positions, get_qualitative_as_of_dates, get_year_as_of, get_df_qualitative, get_countries,
+    get_indicator_data_num, get_indicator_data, filter_qualitative_by_country, build_members_index,
+    get_members_index, get_members, filter_prices_by_country,
+    get_reference_prices, get_forex_data
+)
+from .calculs import (
+    ReturnsStore, calculate_daily_returns, calculate_volatility, build_returns_store, get_returns_store,
+    get_window_bounds, get_window_returns_sum, get_window_cumulative_returns, get_window_volatility,
+    get_rolling_volatility, CURRENCIES, get_cross_rates, convert_all_currencies, convert_prices
+)
+from .indicateurs import (
+    TRADING_DAYS, PERCENT_INDICATORS, ROLLING_WINDOWS, get_first_last_values, compute_indicators, format_indicators,
+    calculer_indicateurs, prefix_sum, compute_drawdown, compute_rolling_indicators
+)
+from .filtres import (
+    get_percentile, get_intersection, reduce_series, get_common_elements, calculate_weights,
+    selection_top_100_returns
+)
+from .regles import (
+    RETURNS_FACTORS, LOW_VOL_PER_SPEC, STRATEGY_SPECS, load_strategy_spec, register_strategy_spec, get_returns_factor,
+    get_qualitative_factor, get_row_quantiles, get_quantile_thresholds, get_top_mask, compile_rule, get_spec_weights,
+    select_spec_weights, spec_strategy
+)
+from .ponderations import (
+    WEIGHT_CAP, MAX_ITERATIONS, KKT_TOLERANCE, get_selection_batch, get_returns_batch, get_sample_covariance, get_shrunk_covariance,
+    complete_matrices, normalize_weights, equal_weights, capped_weights, inverse_volatility_weights,
+    minimum_variance_weights, risk_parity_weights, WEIGHTING_SCHEMES, get_scheme_weights, weighting_strategy
+)
+from .backtest import (
+    REBALANCING_FREQUENCIES, QUALITATIVE_YEARS, START_YEAR, UNIVERSES, INDICES, MOMENTUM_LOOKBACK,
+    RebalancePeriod, Attribution, get_portfolio_values, index_tracking, continuity_index, rebalance_calendar, get_period_attribution,
+    run_backtest, append_prices, check_last_date, update_backtest, get_trades, bps_cost_model, spread_cost_model, COST_MODELS,
+    get_cost_factors, get_qualitative_as_of, high_vol_per_strategy, momentum_strategy,
+    country_strategy, get_indices, get_calendar, build_strategy, replay_strategy, get_index_values,
+    summarize_attribution, update_index_values, get_index_currencies, get_complete_prices
+)
+from .resultats import (
+    RESULTS_VERSION, IndexResults, UPDATES_DIR, APPENDED_TABLES, get_results_path, read_results_tables,
+    write_results_tables, get_update_names, load_results, save_results, save_update, get_results_indicators,
+    build_results, compute_results, get_results, get_results_calendar, get_results_prices, get_index_costs,
+    get_index_attribution, update_results
+)
+from .robustesse import (
+    N_REPLICAS, BLOCK_SIZE, CONFIDENCE, MAX_SHIFT, THRESHOLD_SPREAD, CHUNK_REPLICAS, HIGH_VOL_PER_RULES, MOMENTUM_RULES,
+    get_replica_spec, perturb_rule, get_perturbed_calendars, run_replica_backtest, run_replica_chunk,
+    run_perturbation_replicas, get_block_bootstrap_positions, run_block_bootstrap, get_confidence_intervals,
+    get_robustness
+)
+from .sweep import init_worker, get_process_pool, get_sweep_tasks, load_shared_data, run_sweep_task, run_sweep
+from .prechauffage import (
+    WARMUP_WORKERS, WARMUP_STATE, get_main_country, get_warmup_tasks, warm_up_task, warm_up, start_warmup,
+    get_warmup_status
+)
@@ -0,0 +1,513 @@
+"""
+Fonctions de suivi d'indice et de backtest
+
+Ces fonctions permettent de suivre l'évolution de l'indice à partir des données, puis de le construire sur plusieurs
+périodes de rebalancement à partir d'un calendrier et d'une fonction de sélection et de pondération des titres.
+"""
+
+# Importation des packages nécessaires
+from collections import namedtuple
+import pandas as pd
+import numpy as np
+
+from .donnees import (
+    CHUNK_SIZE, cache_by_key, get_df_prices, get_df_qualitative, get_qualitative_store, get_qualitative_years, get_year_as_of,
+    get_indicator_data_num, build_members_index, get_members
+)
+from .donnees import get_forex_data
+from .calculs import (
+    CURRENCIES, build_returns_store, get_returns_store, get_window_volatility, get_window_returns_sum,
+    convert_all_currencies
+)
+from .filtres import get_percentile, get_intersection, reduce_series, get_common_elements, calculate_weights
+from .ponderations import get_scheme_weights, weighting_strategy
+from .regles import STRATEGY_SPECS, select_spec_weights, spec_strategy
+from .profilage import profile_stage
+
+
+# Fonction qui calcule la valeur de portefeuilles de quantités fixes (weights : titres, ou titres x portefeuilles) sur
+# les lignes first à last de la matrice des prix. Le calcul reste dans le type de la matrice (float32 mappé en mémoire
+# avec COMPACT_PRICES) et se fait par blocs de CHUNK_SIZE dates : les prix manquants, qui ne contribuent pas à la
+# valeur, ne sont remplacés par zéro que dans le bloc en cours, sans copie de tout le panel
+def get_portfolio_values(prices, weights, first=0, last=None):
+    last = len(prices) - 1 if last is None else last
+    weights = weights.astype(prices.dtype, copy=False)
+    values = [
+        np.nan_to_num(prices[start:min(start + CHUNK_SIZE, last + 1)], nan=0.0) @ weights
+        for start in range(first, last + 1, CHUNK_SIZE)
+    ]
+
+    return np.concatenate(values).astype(float, copy=False)
+
+
+# Fonction qui suit la valeur de l'indice 
+@profile_stage()
+def index_tracking(df_prices, df_weights):
+    
+    # Aligner une seule fois les poids sur les colonnes de prix (titre absent ou poids manquant = poids nul)
+    weights = df_weights.reindex(df_prices.columns).fillna(0).to_numpy(dtype=float)
+
+    # Calculer les prix de l'indice sur toute la période par produits matrice-vecteur (les prix manquants ne
+    # contribuent pas à la valeur de l'indice)
+    df_index_values = pd.Series(get_portfolio_values(df_prices.to_numpy(), weights), index=df_prices.index)
+
+    return df_index_values
+
+
+# Fonction qui assure la continuité des valeurs de l'indice après rebalancement
+def continuity_index(df_index_values, df_previous_values):
+    df_new_values = df_index_values * df_previous_values.iloc[-1] / df_index_values.iloc[0]
+
+    return df_new_values
+
+
+# Fréquences de rebalancement disponibles et numéro de période associé à chaque date
+REBALANCING_FREQUENCIES = {
+    "annual": lambda dates: dates.year,
+    "semi-annual": lambda dates: dates.year * 2 + (dates.month > 6),
+    "quarterly": lambda dates: dates.year * 4 + (dates.month - 1) // 3,
+    "monthly": lambda dates: dates.year * 12 + dates.month - 1,
+}
+
+# Période de détention de l'indice et période d'observation utilisée pour la sélection des titres
+RebalancePeriod = namedtuple("RebalancePeriod", ["number", "start", "end", "lookback_start", "lookback_end"])
+
+
+# Fonction qui construit le calendrier des périodes de rebalancement
+def rebalance_calendar(dates, frequency="annual", start=None, lookback=1, gap=0):
+    dates = pd.DatetimeIndex(dates)
+
+    # Fréquence prédéfinie ou liste de dates de rebalancement personnalisées
+    if isinstance(frequency, str):
+        period_codes = np.asarray(REBALANCING_FREQUENCIES[frequency](dates))
+    else:
+        rebalance_dates = pd.DatetimeIndex(sorted(pd.to_datetime(frequency)))
+        period_codes = np.searchsorted(rebalance_dates.values, dates.values, side="right")
+
+    # Positions de la première et de la dernière date de chaque période
+    breaks = np.flatnonzero(np.diff(period_codes)) + 1
+    starts = np.r_[0, breaks]
+    ends = np.r_[breaks, len(dates)] - 1
+
+    # La période d'observation couvre les "lookback" périodes qui précèdent la détention, décalées de "gap" périodes
+    calendar = []
+    for k in range(lookback + gap, len(starts)):
+        if start is not None and dates[starts[k]] < pd.Timestamp(str(start)):
+            continue
+        calendar.append(RebalancePeriod(
+            number=len(calendar),
+            start=dates[starts[k]],
+            end=dates[ends[k]],
+            lookback_start=dates[starts[k - gap - lookback]],
+            lookback_end=dates[ends[k - gap - 1]]
+        ))
+
+    return calendar
+
+
+# Attribution de la performance d'un indice par titre (dates de détention x titres détenus) : poids réels après
+# dérive des prix, contribution de chaque titre au rendement quotidien de l'indice et contribution cumulée au
+# rendement de l'indice depuis le dernier rebalancement
+Attribution = namedtuple("Attribution", ["weights", "contributions", "cumulative_contributions"])
+
+
+# Fonction qui calcule l'attribution d'une période à partir de la valeur des positions de chaque titre à chaque date
+def get_period_attribution(holdings, segment):
+    weights = holdings / segment[:, None]
+
+    # Le rendement du premier jour de la période est nul (chaînage au dernier niveau de la période précédente)
+    contributions = np.zeros_like(holdings)
+    contributions[1:] = np.diff(holdings, axis=0) / segment[:-1, None]
+    cumulative_contributions = (holdings - holdings[0]) / segment[0]
+
+    return weights, contributions, cumulative_contributions
+
+
+# Fonction qui calcule l'indice chaîné sur toutes les périodes d'un calendrier de rebalancement
+# (attribution=True : renvoie aussi l'attribution par titre, calculée sur les mêmes matrices que l'indice)
+@profile_stage()
+def run_backtest(df_prices, calendar, strategy, attribution=False):
+    # Matrice de prix partagée par toutes les périodes, sans copie ni conversion
+    prices = df_prices.to_numpy()
+    weights = np.zeros((len(calendar), df_prices.shape[1]))
+
+    segments = []
+    attributions = []
+    for position, period in enumerate(calendar):
+        # Sélection et pondération des titres à partir de la période d'observation
+        df_weights = strategy(df_prices, period)
+        weights[position] = df_weights.reindex(df_prices.columns).fillna(0).to_numpy(dtype=float)
+
+        # Valeur de l'indice sur la période de détention avec les poids fixés au rebalancement
+        first = df_prices.index.get_loc(period.start)
+        last = df_prices.index.get_loc(period.end)
+        segments.append(get_portfolio_values(prices, weights[position], first, last))
+
+        # Valeur des positions de chaque titre : leur somme sur chaque ligne est la valeur de l'indice
+        if attribution:
+            holdings = np.nan_to_num(prices[first:last + 1], nan=0.0) * weights[position]
+            attributions.append(get_period_attribution(holdings, segments[-1]))
+
+    # Chaînage : chaque période démarre au dernier niveau de la précédente (comme continuity_index)
+    first_values = np.array([segment[0] for segment in segments])
+    last_values = np.array([segment[-1] for segment in segments])
+    chain_factors = np.cumprod(np.r_[1.0, last_values[:-1] / first_values[1:]])
+
+    holding_dates = np.concatenate([
+        np.arange(df_prices.index.get_loc(period.start), df_prices.index.get_loc(period.end) + 1)
+        for period in calendar
+    ])
+    df_index_values = pd.Series(
+        np.concatenate([segment * factor for segment, factor in zip(segments, chain_factors)]),
+        index=df_prices.index[holding_dates]
+    )
+
+    # Poids des titres à chaque date de rebalancement
+    df_weights_periods = pd.DataFrame(weights, index=[period.start for period in calendar], columns=df_prices.columns)
+
+    if not attribution:
+        return df_index_values, df_weights_periods
+
+    # Attribution limitée aux titres détenus au moins une fois, empilée sur les dates de détention
+    held = (weights > 0).any(axis=0)
+    index_attribution = Attribution(*(
+        pd.DataFrame(
+            np.concatenate([values[:, held] for values in measure]),
+            index=df_index_values.index,
+            columns=df_prices.columns[held]
+        )
+        for measure in zip(*attributions)
+    ))
+
+    return df_index_values, df_weights_periods, index_attribution
+
+
+# Fonction qui ajoute de nouvelles dates à un dataframe de prix retraité : seules les nouvelles lignes sont complétées
+# par la dernière valeur connue, l'historique et les titres retenus restent inchangés
+def append_prices(df_prices, df_new_prices):
+    df_new_prices = df_new_prices.loc[df_new_prices.index > df_prices.index[-1]].reindex(columns=df_prices.columns)
+    df_tail = pd.concat([df_prices.iloc[-1:], df_new_prices]).ffill().iloc[1:]
+
+    return pd.concat([df_prices, df_tail])
+
+
+# Fonction qui vérifie que les prix d'une mise à jour contiennent la dernière date de l'indice : sans ces prix, le
+# rendement du premier nouveau jour serait perdu
+def check_last_date(df_index_values, df_prices):
+    last_date = df_index_values.index[-1]
+    if last_date not in df_prices.index:
+        raise ValueError(f"Prix du {last_date:%Y-%m-%d}, dernière date de l'indice, absents des prix de la mise à jour")
+
+    return last_date
+
+
+# Fonction qui prolonge un indice déjà calculé sur les nouvelles dates de prix, sans recalculer l'historique
+# (strategy n'est appelée que si une nouvelle période de rebalancement commence ; df_prices doit alors contenir tout
+# l'historique, sinon les prix à partir de la dernière date de l'indice suffisent)
+def update_backtest(df_index_values, df_weights_periods, df_prices, calendar, strategy):
+    last_date = check_last_date(df_index_values, df_prices)
+    last_level = df_index_values.iloc[-1]
+
+    # Période en cours : prolongée avec ses poids à partir du dernier niveau et des derniers prix stockés
+    current = [period for period in calendar if period.start <= last_date][-1]
+    weights = df_weights_periods.loc[current.start].reindex(df_prices.columns).fillna(0).to_numpy(dtype=float)
+    df_prices_tail = df_prices.loc[last_date:current.end]
+    values = get_portfolio_values(df_prices_tail.to_numpy(), weights)
+    df_values = pd.Series(last_level * values / values[0], index=df_prices_tail.index)
+
+    segments = [df_values.iloc[1:]]
+    df_weights_segments = [df_weights_periods]
+
+    # Nouvelles périodes : calculées comme dans run_backtest puis chaînées au dernier niveau de l'indice
+    new_periods = [period for period in calendar if period.start > last_date]
+    if new_periods:
+        df_new_values, df_new_weights = run_backtest(df_prices, new_periods, strategy)
+        segments.append(continuity_index(df_new_values, df_values))
+        df_weights_segments.append(df_new_weights.reindex(columns=df_weights_periods.columns, fill_value=0.0))
+
+    df_index_values = pd.concat([df_index_values] + segments)
+    df_weights_periods = pd.concat(df_weights_segments)
+
+    return df_index_values, df_weights_periods
+
+
+# Fonction qui calcule les transactions de chaque rebalancement : écart entre les poids cibles de la nouvelle période
+# et les poids de la période précédente après dérive des prix (la première période part d'un portefeuille vide)
+def get_trades(df_prices, df_weights_periods, calendar):
+    weights = df_weights_periods.reindex(columns=df_prices.columns).fillna(0).to_numpy(dtype=float)
+    starts = df_prices.index.get_indexer([period.start for period in calendar])
+    ends = df_prices.index.get_indexer([period.end for period in calendar])
+
+    # Prix des seules dates de début et de fin des périodes (les prix manquants ne contribuent pas à l'indice)
+    prices = df_prices.to_numpy()
+    start_prices = np.nan_to_num(prices[starts].astype(float), nan=0.0)
+    end_prices = np.nan_to_num(prices[ends].astype(float), nan=0.0)
+
+    # Poids réels au début (cibles) et à la fin (après dérive) de chaque période, pour tout le calendrier à la fois
+    # (une période sans titre, pays sans membre ou règles sans sélection, garde des poids nuls)
+    def normalize(values):
+        sums = values.sum(axis=1, keepdims=True)
+        return np.divide(values, sums, out=np.zeros_like(values), where=sums > 0)
+
+    target_weights = normalize(weights * start_prices)
+    drifted_weights = normalize(weights * end_prices)
+    previous_weights = np.vstack([np.zeros((1, weights.shape[1])), drifted_weights[:-1]])
+
+    return pd.DataFrame(target_weights - previous_weights, index=df_weights_periods.index, columns=df_prices.columns)
+
+
+# Fonction qui renvoie le modèle de coûts d'un nombre de points de base par sens (achat ou vente)
+def bps_cost_model(bps):
+
+    def cost_model(df_trades):
+        return df_trades.abs().sum(axis=1) * bps / 10000
+
+    return cost_model
+
+
+# Fonction qui renvoie le modèle de coûts de la fourchette achat-vente : chaque transaction paie une demi-fourchette
+# (spreads en points de base, un nombre pour tous les titres ou une série par titre)
+def spread_cost_model(spreads):
+
+    def cost_model(df_trades):
+        half_spreads = pd.Series(spreads, index=df_trades.columns, dtype=float) / 2 / 10000
+        return df_trades.abs() @ half_spreads.fillna(0)
+
+    return cost_model
+
+
+# Modèles de coûts de transaction disponibles
+COST_MODELS = {"bps": bps_cost_model, "spread": spread_cost_model}
+
+
+# Fonction qui renvoie le facteur appliqué à l'indice brut pour obtenir l'indice net de coûts : chaque rebalancement
+# réduit l'indice de son coût, à partir de sa date de début
+def get_cost_factors(df_index_values, costs):
+    df_factors = (1 - costs).cumprod().reindex(df_index_values.index).ffill()
+
+    return df_factors.fillna(1.0)
+
+
+# Fonction qui renvoie les données qualitatives de la dernière année disponible à une date donnée
+def get_qualitative_as_of(df_qualitative_years, date):
+    return df_qualitative_years[get_year_as_of(df_qualitative_years, date)]
+
+
+# Fonction qui renvoie la stratégie de l'indice High vol PER
+def high_vol_per_strategy(df_qualitative_years, returns_store):
+
+    def strategy(df_prices, period):
+        # La première sélection utilise tout l'historique de prix disponible
+        lookback_start = df_prices.index[0] if period.number == 0 else period.lookback_start
+        df_volatility = get_window_volatility(returns_store, lookback_start, period.lookback_end)
+        df_qualitative = get_qualitative_as_of(df_qualitative_years, period.lookback_end)
+
+        # Sélection des 60% des titres les plus volatils et des 30% avec le PER le plus élevé
+        df_high_vol = get_percentile(df_volatility.dropna(), 0.4)
+        df_high_per = get_percentile(get_indicator_data_num(df_qualitative, "PE_RATIO"), 0.7)
+        stocks_index = get_intersection(df_high_vol, df_high_per)
+
+        # Pondération par la capitalisation boursière
+        df_capitalization = reduce_series(get_indicator_data_num(df_qualitative, "CUR_MKT_CAP"), stocks_index)
+
+        return calculate_weights(df_capitalization)
+
+    return strategy
+
+
+# Fonction qui renvoie la stratégie de l'indice Momentum
+def momentum_strategy(df_qualitative_years, returns_store):
+
+    def strategy(df_prices, period):
+        df_returns_sum = get_window_returns_sum(returns_store, period.lookback_start, period.lookback_end)
+        df_qualitative = get_qualitative_as_of(df_qualitative_years, period.lookback_end)
+
+        # Sélection des 100 titres les plus performants pondérés par la capitalisation boursière
+        top_100_returns = df_returns_sum.nlargest(100).index.tolist()
+        df_capitalization = reduce_series(get_indicator_data_num(df_qualitative, "CUR_MKT_CAP"), top_100_returns)
+
+        return calculate_weights(df_capitalization)
+
+    return strategy
+
+
+# Fonction qui renvoie la stratégie de l'indice géographique (un pays ou une liste de pays)
+def country_strategy(df_qualitative_years, country):
+    # Index des titres par pays de chaque année, construit une seule fois pour toutes les périodes
+    members_index_years = {
+        year: build_members_index(df_qualitative, "COUNTRY") for year, df_qualitative in df_qualitative_years.items()
+    }
+
+    def strategy(df_prices, period):
+        year = get_year_as_of(df_qualitative_years, period.lookback_end)
+
+        # Titres du pays pondérés par la capitalisation boursière
+        df_qualitative_country = df_qualitative_years[year].loc[get_members(members_index_years[year], country)]
+        df_capitalization = get_indicator_data_num(df_qualitative_country, "CUR_MKT_CAP")
+
+        return calculate_weights(df_capitalization)
+
+    return strategy
+
+
+# Années des données qualitatives disponibles et première année de suivi des indices
+QUALITATIVE_YEARS = range(2018, 2021)
+START_YEAR = 2019
+
+# Univers d'investissement et indices disponibles
+UNIVERSES = ["SPX", "SXXP"]
+INDICES = ["High vol PER", "Momentum 6 months", "Géographique"]
+
+
+# Fonction qui renvoie les indices disponibles : ceux de l'application puis ceux définis par des règles
+def get_indices():
+    return INDICES + [indice for indice in STRATEGY_SPECS if indice not in INDICES]
+
+# Nombre de périodes couvrant 6 mois de rendements pour l'indice Momentum selon la fréquence de rebalancement
+MOMENTUM_LOOKBACK = {"annual": 1, "semi-annual": 1, "quarterly": 2, "monthly": 6}
+
+
+# Fonction qui construit le calendrier de rebalancement d'un indice (fréquence par défaut de l'indice si None)
+def get_calendar(dates, indice, frequency=None):
+    if indice in STRATEGY_SPECS:
+        # Calendrier de la spécification de l'indice défini par des règles
+        rebalancing = STRATEGY_SPECS[indice].get("rebalancing", {})
+        if frequency is None:
+            return rebalance_calendar(
+                dates, rebalancing.get("frequency", "annual"), start=START_YEAR,
+                lookback=rebalancing.get("lookback", 1), gap=rebalancing.get("gap", 0)
+            )
+
+        lookback = rebalancing.get("lookback_by_frequency", {}).get(frequency, 1)
+        return rebalance_calendar(dates, frequency, start=START_YEAR, lookback=lookback)
+
+    if indice == "Momentum 6 months":
+        if frequency is None:
+            # Rebalancement semestriel sur les rendements du même semestre de l'année précédente
+            return rebalance_calendar(dates, "semi-annual", start=START_YEAR, lookback=1, gap=1)
+
+        return rebalance_calendar(dates, frequency, start=START_YEAR, lookback=MOMENTUM_LOOKBACK[frequency])
+
+    return rebalance_calendar(dates, frequency or "annual", start=START_YEAR)
+
+
+# Fonction qui renvoie la stratégie de sélection et de pondération d'un indice
+def build_strategy(indice, df_qualitative_years, returns_store, country=None):
+    if indice == "High vol PER":
+        return high_vol_per_strategy(df_qualitative_years, returns_store)
+    elif indice == "Momentum 6 months":
+        return momentum_strategy(df_qualitative_years, returns_store)
+    elif indice == "Géographique":
+        return country_strategy(df_qualitative_years, country)
+    elif indice in STRATEGY_SPECS:
+        return spec_strategy(STRATEGY_SPECS[indice], get_qualitative_store(), returns_store)
+
+    raise ValueError(f"Indice inconnu : {indice}")
+
+
+# Fonction qui renvoie une stratégie qui reprend les poids déjà calculés de chaque rebalancement
+def replay_strategy(df_weights_periods):
+
+    def strategy(df_prices, period):
+        return df_weights_periods.loc[period.start]
+
+    return strategy
+
+
+# Fonction qui calcule un indice et les poids de ses titres à chaque rebalancement (country : un pays ou un tuple de
+# pays, weighting : schéma de pondération des titres sélectionnés, None pour la capitalisation boursière)
+@profile_stage()
+@cache_by_key()
+def get_index_values(ticker, indice, country=None, frequency=None, weighting=None):
+    df_prices = get_df_prices(ticker)
+    df_qualitative_years = {year: get_df_qualitative(ticker, year) for year in get_qualitative_years()}
+    returns_store = get_returns_store(ticker)
+
+    calendar = get_calendar(df_prices.index, indice, frequency)
+
+    if indice in STRATEGY_SPECS:
+        # Indice défini par des règles : sélection de toutes les périodes en un seul lot
+        df_weights_periods = select_spec_weights(
+            STRATEGY_SPECS[indice], get_qualitative_store(), returns_store, calendar
+        )
+        strategy = replay_strategy(df_weights_periods)
+    else:
+        strategy = build_strategy(indice, df_qualitative_years, returns_store, country)
+
+    df_index_values, df_weights_periods = run_backtest(df_prices, calendar, strategy)
+    if weighting is None:
+        return df_index_values, df_weights_periods
+
+    # Repondération des titres sélectionnés de toutes les périodes en un seul lot
+    df_weights_periods = get_scheme_weights(df_prices, df_weights_periods, calendar, returns_store, weighting)
+
+    return run_backtest(df_prices, calendar, replay_strategy(df_weights_periods))
+
+
+# Fonction qui résume l'attribution de chaque période de rebalancement par titre : poids réel au rebalancement,
+# poids réel en fin de période et contribution au rendement de l'indice sur la période
+def summarize_attribution(index_attribution, calendar):
+    starts = [period.start for period in calendar]
+    ends = [period.end for period in calendar]
+
+    df_summary = pd.concat({
+        "Poids au rebalancement": index_attribution.weights.loc[starts].set_axis(starts),
+        "Poids en fin de période": index_attribution.weights.loc[ends].set_axis(starts),
+        "Contribution": index_attribution.cumulative_contributions.loc[ends].set_axis(starts)
+    }).stack().unstack(0)
+    df_summary.index.names = ["Période", "Titre"]
+
+    # Seuls les titres détenus sur la période sont conservés
+    return df_summary[df_summary["Poids au rebalancement"] > 0]
+
+
+# Fonction qui met à jour un indice avec de nouveaux prix de fin de journée : le coût dépend des nouvelles dates
+# et non de tout l'historique, sauf au début d'une nouvelle période de rebalancement. df_prices contient les prix
+# retraités depuis la dernière date du classeur (prolongés par les mises à jour précédentes) jusqu'à la dernière date
+# de l'indice ; les prix du classeur ne sont relus que pour sélectionner les titres d'une nouvelle période
+@profile_stage()
+def update_index_values(df_index_values, df_weights_periods, df_prices, df_new_prices, ticker, indice,
+                        country=None, frequency=None, weighting=None):
+    check_last_date(df_index_values, df_prices)
+    df_prices = append_prices(df_prices, df_new_prices)
+
+    # Calendrier de toutes les dates : celles du classeur puis celles ajoutées par les mises à jour
+    df_history_prices = get_df_prices(ticker)
+    dates = df_history_prices.index.append(df_prices.index[df_prices.index > df_history_prices.index[-1]])
+    calendar = get_calendar(dates, indice, frequency)
+
+    strategy = None
+    if calendar[-1].start > df_index_values.index[-1]:
+        df_prices = append_prices(df_history_prices, df_prices)
+        df_qualitative_years = {year: get_df_qualitative(ticker, year) for year in get_qualitative_years()}
+        returns_store = build_returns_store(df_prices)
+        strategy = build_strategy(indice, df_qualitative_years, returns_store, country)
+        if weighting is not None:
+            strategy = weighting_strategy(strategy, returns_store, weighting)
+
+    df_index_values, df_weights_periods = update_backtest(
+        df_index_values, df_weights_periods, df_prices, calendar, strategy
+    )
+
+    return df_index_values, df_weights_periods, df_prices
+
+
+# Fonction qui convertit un indice dans toutes les devises, une seule fois par jeu de paramètres
+@profile_stage()
+@cache_by_key()
+def get_index_currencies(ticker, indice, country=None, frequency=None, weighting=None):
+    df_index_values, df_weights_periods = get_index_values(ticker, indice, country, frequency, weighting)
+
+    return convert_all_currencies(df_index_values, get_forex_data())
+
+
+# Fonction qui rebase à 100 l'indice converti dans une devise et l'indice de référence sur leurs dates communes
+@profile_stage()
+def get_complete_prices(df_index_currency, df_reference_prices):
+    df_index_values = pd.DataFrame(df_index_currency.dropna())
+
+    df_complete_prices = get_common_elements(df_index_values, df_reference_prices)
+    for column in df_complete_prices.columns:
+        df_complete_prices[column] = df_complete_prices[column] / df_complete_prices[column].iloc[0] * 100
+
+    return df_complete_prices
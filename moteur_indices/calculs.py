@@ -0,0 +1,158 @@
+"""
+Fonctions de calcul à partir des données collectées
+
+Ces fonctions permettent de calculer des indicateurs à partir des données collectées ou bien leur transformation
+"""
+
+# Importation des packages nécessaires
+from collections import namedtuple
+import pandas as pd
+import numpy as np
+
+from .donnees import cache_by_key, get_df_prices
+from .profilage import profile_stage
+
+
+# Fonction qui calcule les rendements quotidiens d'un dataframe de prix
+def calculate_daily_returns(df_prices):
+    df_daily_returns = df_prices.pct_change()
+
+    return df_daily_returns
+
+
+# Fonction qui calcule la volatilité annuelle d'un dataframe de rendements quotidiens
+def calculate_volatility(df_daily_returns):
+    df_vol = df_daily_returns.std() * np.sqrt(252)
+
+    return df_vol
+
+
+# Rendements quotidiens d'un univers et sommes cumulées par titre permettant d'agréger n'importe quelle fenêtre
+ReturnsStore = namedtuple("ReturnsStore", ["dates", "tickers", "returns", "sum", "sum_squares", "sum_log", "count"])
+
+
+# Fonction qui calcule une seule fois les rendements et leurs sommes cumulées pour tout le dataframe de prix
+def build_returns_store(df_prices):
+    returns = calculate_daily_returns(df_prices).to_numpy(dtype=float)
+    valid = ~np.isnan(returns)
+    returns_filled = np.where(valid, returns, 0.0)
+
+    # Sommes cumulées précédées d'une ligne de zéros : la somme des lignes a à b vaut cumsum[b + 1] - cumsum[a]
+    def prefix_sum(values):
+        return np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+
+    return ReturnsStore(
+        dates=df_prices.index,
+        tickers=df_prices.columns,
+        returns=returns,
+        sum=prefix_sum(returns_filled),
+        sum_squares=prefix_sum(returns_filled ** 2),
+        sum_log=prefix_sum(np.log1p(returns_filled)),
+        count=prefix_sum(valid.astype(float))
+    )
+
+
+# Fonction qui renvoie le store de rendements d'un univers, partagé par toutes les stratégies
+@profile_stage()
+@cache_by_key()
+def get_returns_store(ticker):
+    return build_returns_store(get_df_prices(ticker))
+
+
+# Fonction qui renvoie les bornes des lignes de rendements d'une fenêtre de prix [start, end]
+def get_window_bounds(returns_store, start, end):
+    # Comme pour pct_change sur la fenêtre, le rendement de la première date de la fenêtre est exclu
+    first = returns_store.dates.searchsorted(pd.Timestamp(start), side="left") + 1
+    last = returns_store.dates.searchsorted(pd.Timestamp(end), side="right")
+
+    return first, max(first, last)
+
+
+# Fonction qui calcule la somme des rendements quotidiens de chaque titre sur une fenêtre
+def get_window_returns_sum(returns_store, start, end):
+    first, last = get_window_bounds(returns_store, start, end)
+
+    return pd.Series(returns_store.sum[last] - returns_store.sum[first], index=returns_store.tickers)
+
+
+# Fonction qui calcule le rendement composé de chaque titre sur une fenêtre
+def get_window_cumulative_returns(returns_store, start, end):
+    first, last = get_window_bounds(returns_store, start, end)
+
+    return pd.Series(np.expm1(returns_store.sum_log[last] - returns_store.sum_log[first]), index=returns_store.tickers)
+
+
+# Fonction qui calcule la volatilité annuelle de chaque titre sur une fenêtre
+def get_window_volatility(returns_store, start, end):
+    first, last = get_window_bounds(returns_store, start, end)
+    n = returns_store.count[last] - returns_store.count[first]
+    total = returns_store.sum[last] - returns_store.sum[first]
+    total_squares = returns_store.sum_squares[last] - returns_store.sum_squares[first]
+
+    # Variance empirique (ddof=1) comme pandas, non définie avec moins de deux rendements
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.where(n > 1, (total_squares - total ** 2 / n) / (n - 1), np.nan)
+
+    return pd.Series(np.sqrt(np.maximum(variance, 0)) * np.sqrt(252), index=returns_store.tickers)
+
+
+# Fonction qui calcule la volatilité annuelle glissante de chaque titre sur une fenêtre de "window" rendements
+def get_rolling_volatility(returns_store, window):
+    total = returns_store.sum[window:] - returns_store.sum[:-window]
+    total_squares = returns_store.sum_squares[window:] - returns_store.sum_squares[:-window]
+    n = returns_store.count[window:] - returns_store.count[:-window]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.where(n > 1, (total_squares - total ** 2 / n) / (n - 1), np.nan)
+
+    return pd.DataFrame(
+        np.sqrt(np.maximum(variance, 0)) * np.sqrt(252),
+        index=returns_store.dates[window - 1:],
+        columns=returns_store.tickers
+    )
+
+
+# Devises disponibles (les données Forex donnent la valeur d'un euro dans chaque devise : EURUSD, EURGBP...)
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CNY"]
+
+
+# Fonction qui construit le cube des taux de change croisés (date x devise source x devise cible) sur un calendrier
+def get_cross_rates(df_forex, dates, currencies=CURRENCIES):
+    # Nombre d'unités de chaque devise pour un euro, dernier cours connu à chaque date du calendrier
+    df_units = pd.DataFrame({
+        currency: 1.0 if currency == "EUR" else df_forex["EUR" + currency] for currency in currencies
+    }, index=df_forex.index).sort_index()
+    df_units = df_units[~df_units.index.duplicated(keep="last")]
+    units = df_units.reindex(df_units.index.union(dates)).ffill().reindex(dates).to_numpy(dtype=float)
+
+    # Taux pour passer de la devise a à la devise b : unités de b par euro / unités de a par euro
+    cross_rates = units[:, None, :] / units[:, :, None]
+
+    return cross_rates
+
+
+# Fonction qui convertit une série ou un dataframe de prix dans toutes les devises en un seul calcul
+@profile_stage()
+def convert_all_currencies(df_prices, df_forex, source="USD", currencies=CURRENCIES):
+    rates = get_cross_rates(df_forex, df_prices.index, currencies)[:, currencies.index(source), :]
+
+    # Série : une colonne par devise
+    if isinstance(df_prices, pd.Series):
+        return pd.DataFrame(df_prices.to_numpy(dtype=float)[:, None] * rates, index=df_prices.index, columns=currencies)
+
+    # Dataframe : colonnes (devise, titre), dans le type du panel (float32 avec COMPACT_PRICES)
+    prices = df_prices.to_numpy()
+    prices_converted = prices[:, None, :] * rates[:, :, None].astype(prices.dtype)
+    columns = pd.MultiIndex.from_product([currencies, df_prices.columns])
+
+    return pd.DataFrame(prices_converted.reshape(len(df_prices), -1), index=df_prices.index, columns=columns)
+
+
+# Fonction qui convertit les prix d'une devise à une autre
+def convert_prices(df_prices, df_forex, currency):
+    df_prices_converted = convert_all_currencies(df_prices, df_forex, currencies=sorted({"USD", currency}))[currency]
+
+    if isinstance(df_prices, pd.Series):
+        df_prices_converted = df_prices_converted.rename(df_prices.name)
+            
+    return pd.DataFrame(df_prices_converted.dropna())
@@ -0,0 +1,227 @@
+"""
+Ligne de commande du moteur de calcul des indices.
+
+Exemples :
+    python -m moteur_indices build-index --universe SXXP --strategy momentum --currency EUR --out momentum.csv
+    python -m moteur_indices build-index --universe SPX --strategy country --country FRANCE --out france.parquet
+    python -m moteur_indices build-index --universe SPX --spec low_vol.yaml --out low_vol.csv
+    python -m moteur_indices sweep --out resultats --workers 8
+    python -m moteur_indices warm-up
+    python -m moteur_indices update --universe SPX --strategy momentum --prices prix_du_jour.csv
+    python -m moteur_indices robustness --universe SPX --strategy momentum --replicas 10000 --workers 8
+    python -m moteur_indices --profile profil.jsonl build-index --universe SPX --strategy momentum --out momentum.csv
+"""
+
+# Importation des packages nécessaires
+import argparse
+
+import pandas as pd
+
+from . import donnees
+from .profilage import enable_profiling, write_profile_log
+from .calculs import CURRENCIES
+from .indicateurs import calculer_indicateurs
+from .donnees import get_reference_prices
+from .ponderations import WEIGHTING_SCHEMES
+from .regles import load_strategy_spec, register_strategy_spec
+from .backtest import (
+    UNIVERSES, REBALANCING_FREQUENCIES, COST_MODELS, get_index_currencies, get_complete_prices
+)
+from .sweep import run_sweep
+from .prechauffage import warm_up, get_warmup_status
+from .resultats import get_index_costs, update_results
+from .robustesse import N_REPLICAS, get_robustness
+
+# Noms des stratégies en ligne de commande et indices correspondants
+STRATEGIES = {
+    "high-vol-per": "High vol PER",
+    "momentum": "Momentum 6 months",
+    "country": "Géographique",
+}
+
+
+# Fonction qui lit l'option --country : plusieurs pays séparés par des virgules pour un indice régional
+def parse_country(country):
+    if country is not None and "," in country:
+        return tuple(name.strip() for name in country.split(","))
+
+    return country
+
+
+# Fonction qui calcule un indice et écrit ses valeurs (et celles de la référence) en csv ou en parquet
+def build_index(args):
+    if (args.strategy is None) == (args.spec is None):
+        raise SystemExit("une seule des options --strategy et --spec est attendue")
+    indice = STRATEGIES[args.strategy] if args.strategy else register_strategy_spec(load_strategy_spec(args.spec))
+    if indice == "Géographique" and args.country is None:
+        raise SystemExit("--country est obligatoire pour la stratégie country")
+
+    country = parse_country(args.country)
+
+    df_index_currencies = get_index_currencies(args.universe, indice, country, args.rebalancing, args.weighting)
+    df_complete_prices = get_complete_prices(df_index_currencies[args.currency], get_reference_prices(args.universe))
+    df_complete_prices.columns = ["Indice", args.universe]
+
+    # Indice net des coûts de transaction de chaque rebalancement
+    if args.cost > 0:
+        df_turnover, df_cost_factors = get_index_costs(
+            args.universe, indice, country, args.rebalancing, args.weighting, args.cost_model, args.cost
+        )
+        df_cost_factors = df_cost_factors.reindex(df_complete_prices.index)
+        df_complete_prices["Indice net"] = df_complete_prices["Indice"] * df_cost_factors
+
+    if args.out.endswith(".csv"):
+        df_complete_prices.to_csv(args.out)
+    else:
+        df_complete_prices.to_parquet(args.out)
+
+    for name, value in calculer_indicateurs(df_complete_prices["Indice"], df_complete_prices[args.universe]).items():
+        print(f"{name}: {value}")
+
+
+# Fonction qui calcule toutes les combinaisons de paramètres
+def sweep(args):
+    for path in args.spec:
+        register_strategy_spec(load_strategy_spec(path))
+    df_indicators = run_sweep(args.out, args.workers)
+    print(f"{len(df_indicators)} combinaisons calculées dans {args.out}")
+
+
+# Fonction qui calcule et enregistre les résultats des configurations préchauffées par l'application
+# (par exemple avant le lancement du serveur, après une mise à jour du classeur)
+def warm_up_results(args):
+    warm_up(workers=args.workers)
+    done, failed, total = get_warmup_status()
+    print(f"{done}/{total} configurations préchauffées" + (f", {failed} en échec" if failed else ""))
+
+
+# Fonction qui lit les prix de fin de journée postérieurs au classeur (csv ou parquet : une ligne par date, une colonne
+# par titre, les dates en première colonne ou en index)
+def read_new_prices(path):
+    if path.endswith(".csv"):
+        df_new_prices = pd.read_csv(path, index_col=0, parse_dates=True)
+    else:
+        df_new_prices = pd.read_parquet(path)
+        if not isinstance(df_new_prices.index, pd.DatetimeIndex):
+            df_new_prices = df_new_prices.set_index(df_new_prices.columns[0])
+
+    return df_new_prices.set_axis(pd.to_datetime(df_new_prices.index), axis=0).sort_index()
+
+
+# Fonction qui prolonge les résultats enregistrés d'un indice avec des prix de fin de journée, sans recalcul de
+# l'historique (le fichier peut contenir toutes les dates postérieures au classeur : seules les nouvelles sont ajoutées)
+def update(args):
+    if (args.strategy is None) == (args.spec is None):
+        raise SystemExit("une seule des options --strategy et --spec est attendue")
+    indice = STRATEGIES[args.strategy] if args.strategy else register_strategy_spec(load_strategy_spec(args.spec))
+    if indice == "Géographique" and args.country is None:
+        raise SystemExit("--country est obligatoire pour la stratégie country")
+
+    results = update_results(
+        args.universe, indice, read_new_prices(args.prices), parse_country(args.country), args.rebalancing,
+        args.weighting
+    )
+    df_index_values = results.index[args.currency]
+    print(f"Indice mis à jour jusqu'au {df_index_values.index[-1]:%Y-%m-%d} : {df_index_values.iloc[-1]:.4f} "
+          f"({args.currency}, {len(results.weights)} rebalancements)")
+
+
+# Fonction qui affiche les intervalles de confiance des indicateurs d'un indice
+def robustness(args):
+    if (args.strategy is None) == (args.spec is None):
+        raise SystemExit("une seule des options --strategy et --spec est attendue")
+    indice = STRATEGIES[args.strategy] if args.strategy else register_strategy_spec(load_strategy_spec(args.spec))
+    if indice == "Géographique" and args.country is None:
+        raise SystemExit("--country est obligatoire pour la stratégie country")
+
+    df_intervals = get_robustness(
+        args.universe, indice, parse_country(args.country), args.rebalancing, args.weighting, args.currency, args.replicas,
+        args.workers
+    )
+    for method in df_intervals.columns.get_level_values(0).unique():
+        print(f"\n{method} ({args.replicas} répliques)")
+        print(df_intervals[method].round(4).to_string())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="moteur_indices", description="Calcul des indices sans streamlit")
+    parser.add_argument("--workbook", default=None, help="fichier excel des données (par défaut celui du projet)")
+    parser.add_argument("--profile", default=None,
+                        help="fichier json où ajouter la durée et les appels au cache de chaque étape "
+                             "(processus principal seulement)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="mesure aussi la mémoire allouée par chaque étape (calcul plus lent)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_build = subparsers.add_parser("build-index", help="calcule un indice")
+    parser_build.add_argument("--universe", choices=UNIVERSES, required=True)
+    parser_build.add_argument("--strategy", choices=list(STRATEGIES), default=None)
+    parser_build.add_argument("--spec", default=None, help="fichier json ou yaml d'une stratégie définie par des règles")
+    parser_build.add_argument("--currency", choices=CURRENCIES, default="USD")
+    parser_build.add_argument("--country", default=None, help="pays de l'indice géographique (plusieurs pays séparés par des virgules)")
+    parser_build.add_argument("--rebalancing", choices=list(REBALANCING_FREQUENCIES), default=None,
+                              help="fréquence de rebalancement (par défaut celle de l'indice)")
+    parser_build.add_argument("--weighting", choices=list(WEIGHTING_SCHEMES), default=None,
+                              help="pondération des titres sélectionnés (par défaut la capitalisation boursière)")
+    parser_build.add_argument("--cost-model", choices=list(COST_MODELS), default="bps",
+                              help="modèle de coûts : points de base par sens ou fourchette achat-vente")
+    parser_build.add_argument("--cost", type=float, default=0.0,
+                              help="coûts de transaction en points de base (0 : indice brut seulement)")
+    parser_build.add_argument("--out", required=True, help="fichier de sortie (.csv ou .parquet)")
+    parser_build.set_defaults(func=build_index)
+
+    parser_sweep = subparsers.add_parser("sweep", help="calcule toutes les combinaisons de paramètres")
+    parser_sweep.add_argument("--out", default="resultats", help="répertoire des résultats")
+    parser_sweep.add_argument("--spec", action="append", default=[],
+                              help="fichier json ou yaml d'une stratégie à ajouter au calcul (option répétable)")
+    parser_sweep.add_argument("--workers", type=int, default=None, help="nombre de processus (tous les coeurs par défaut)")
+    parser_sweep.set_defaults(func=sweep)
+
+    parser_warm_up = subparsers.add_parser("warm-up", help="calcule les configurations les plus consultées")
+    parser_warm_up.add_argument("--workers", type=int, default=1, help="nombre de threads")
+    parser_warm_up.set_defaults(func=warm_up_results)
+
+    parser_update = subparsers.add_parser(
+        "update", help="prolonge les résultats enregistrés d'un indice avec des prix de fin de journée"
+    )
+    parser_update.add_argument("--universe", choices=UNIVERSES, required=True)
+    parser_update.add_argument("--strategy", choices=list(STRATEGIES), default=None)
+    parser_update.add_argument("--spec", default=None, help="fichier json ou yaml d'une stratégie définie par des règles")
+    parser_update.add_argument("--currency", choices=CURRENCIES, default="USD", help="devise du niveau affiché")
+    parser_update.add_argument("--country", default=None,
+                               help="pays de l'indice géographique (plusieurs pays séparés par des virgules)")
+    parser_update.add_argument("--rebalancing", choices=list(REBALANCING_FREQUENCIES), default=None,
+                               help="fréquence de rebalancement (par défaut celle de l'indice)")
+    parser_update.add_argument("--weighting", choices=list(WEIGHTING_SCHEMES), default=None,
+                               help="pondération des titres sélectionnés (par défaut la capitalisation boursière)")
+    parser_update.add_argument("--prices", required=True,
+                               help="prix de fin de journée postérieurs au classeur (.csv ou .parquet, dates x titres)")
+    parser_update.set_defaults(func=update)
+
+    parser_robustness = subparsers.add_parser(
+        "robustness", help="intervalles de confiance des indicateurs (bootstrap et répliques perturbées du backtest)"
+    )
+    parser_robustness.add_argument("--universe", choices=UNIVERSES, required=True)
+    parser_robustness.add_argument("--strategy", choices=list(STRATEGIES), default=None)
+    parser_robustness.add_argument("--spec", default=None, help="fichier json ou yaml d'une stratégie définie par des règles")
+    parser_robustness.add_argument("--currency", choices=CURRENCIES, default="USD")
+    parser_robustness.add_argument("--country", default=None,
+                                   help="pays de l'indice géographique (plusieurs pays séparés par des virgules)")
+    parser_robustness.add_argument("--rebalancing", choices=list(REBALANCING_FREQUENCIES), default=None,
+                                   help="fréquence de rebalancement (par défaut celle de l'indice)")
+    parser_robustness.add_argument("--weighting", choices=list(WEIGHTING_SCHEMES), default=None,
+                                   help="pondération des titres (répliques du backtest seulement pour la capitalisation)")
+    parser_robustness.add_argument("--replicas", type=int, default=N_REPLICAS, help="nombre de répliques")
+    parser_robustness.add_argument("--workers", type=int, default=None, help="nombre de processus (tous les coeurs par défaut)")
+    parser_robustness.set_defaults(func=robustness)
+
+    args = parser.parse_args(argv)
+    if args.workbook:
+        donnees.EXCEL_FILE = args.workbook
+    if args.profile:
+        enable_profiling(memory=args.profile_memory)
+
+    args.func(args)
+
+    if args.profile:
+        write_profile_log(args.profile, command=args.command)
@@ -0,0 +1,602 @@
+"""
+Fonctions de collecte des données
+
+Ces fonctions permettent de récupérer les données du fichier excel fourni pour le projet.
+Elles permettent aussi de traiter les données avant leur utilisation.
+"""
+
+# Importation des packages nécessaires
+from collections import namedtuple
+import ctypes
+import functools
+import hashlib
+import os
+import shutil
+import threading
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+
+from .profilage import profile_stage, record_cache_call
+
+
+# Fichier excel du projet et répertoire du cache colonnaire (Parquet) de ses feuilles
+EXCEL_FILE = "Data_projets_M1EEF - fige.xlsx"
+CACHE_DIR = ".cache_donnees"
+
+
+# Fonction qui calcule la clé du cache à partir du nom, de la taille et de la date de modification du classeur
+def get_workbook_key(path=None):
+    path = path or EXCEL_FILE
+    stat = os.stat(path)
+    signature = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    return hashlib.sha1(signature.encode()).hexdigest()[:16]
+
+
+# Marqueurs d'erreur des cellules du classeur ("#N/A N/A", "#N/A Field Not Applicable", "#VALUE!"...)
+ERROR_MARKER_PREFIX = "#"
+
+# Proportion minimale de nombres parmi les cellules renseignées d'une colonne mixte pour la lire comme numérique
+# (une colonne textuelle contenant quelques nombres isolés reste textuelle)
+NUMERIC_MAJORITY = 0.9
+
+
+# Fonction qui indique si une colonne est numérique à partir de ses cellules qui sont des nombres et des marqueurs
+# d'erreur : les autres cellules renseignées sont toutes des marqueurs d'erreur ("#N/A N/A"...) ou les nombres sont
+# largement majoritaires
+def is_numeric_column(n_numbers, n_markers, n_filled):
+    return n_numbers > 0 and (n_numbers + n_markers == n_filled or n_numbers >= NUMERIC_MAJORITY * n_filled)
+
+
+# Fonction qui rend une feuille excel compatible avec le format colonnaire
+def prepare_columnar(df_sheet):
+    df_sheet = df_sheet.copy()
+    df_sheet.columns = [str(col) for col in df_sheet.columns]
+
+    for col in df_sheet.columns[df_sheet.dtypes == object]:
+        values = df_sheet[col]
+        is_number = values.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool))
+        is_marker = values.map(lambda v: isinstance(v, str) and v.startswith(ERROR_MARKER_PREFIX))
+        n_filled = values.notna().sum()
+
+        # Colonne numérique : les marqueurs et les textes isolés deviennent NaN
+        if is_numeric_column(is_number.sum(), is_marker.sum(), n_filled):
+            df_sheet[col] = pd.to_numeric(values, errors="coerce")
+        # Colonne textuelle : les valeurs non manquantes sont stockées en chaînes de caractères
+        else:
+            df_sheet[col] = values.where(values.isna(), values.astype(str))
+
+    return df_sheet
+
+
+# Fichier du cache d'une version du classeur contenant le chemin du classeur
+SOURCE_FILE = ".source"
+
+
+# Constantes de l'API Windows utilisées par is_process_alive
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+ERROR_ACCESS_DENIED = 5
+STILL_ACTIVE = 259
+
+
+# Fonction qui indique si un processus existe encore (répertoires temporaires laissés par un processus interrompu)
+def is_process_alive(pid):
+    if os.name == "nt":
+        # os.kill terminerait le processus sous Windows : test par OpenProcess (accès refusé : processus existant)
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return kernel32.GetLastError() == ERROR_ACCESS_DENIED
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == STILL_ACTIVE
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+# Fonction qui supprime les caches des versions précédentes du même classeur et les répertoires temporaires des
+# processus qui n'existent plus ; les caches des autres classeurs (option --workbook) sont conservés
+def clean_cache_root(cache_root, cache_path, source):
+    for entry in os.listdir(cache_root):
+        entry_path = os.path.join(cache_root, entry)
+
+        # Répertoire temporaire nommé <clé>.tmp<pid>_<thread>
+        if ".tmp" in entry:
+            pid = entry.split(".tmp", 1)[1].split("_")[0]
+            stale = pid.isdigit() and not is_process_alive(int(pid))
+        else:
+            try:
+                with open(os.path.join(entry_path, SOURCE_FILE), encoding="utf-8") as file:
+                    stale = entry_path != cache_path and file.read() == source
+            except OSError:
+                stale = False
+
+        if stale:
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+
+# Fonction qui convertit une seule fois toutes les feuilles du classeur en fichiers Parquet
+@profile_stage()
+def ingest_workbook(path=None):
+    path = path or EXCEL_FILE
+    cache_root = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    cache_path = os.path.join(cache_root, get_workbook_key(path))
+
+    # Le cache est déjà à jour pour cette version du classeur
+    if os.path.exists(os.path.join(cache_path, ".complete")):
+        return cache_path
+
+    # Lecture de toutes les feuilles en un seul passage d'openpyxl
+    sheets = pd.read_excel(path, sheet_name=None)
+
+    # Écriture dans un répertoire temporaire renommé à la fin, pour les workers qui ingèrent en parallèle
+    tmp_path = f"{cache_path}.tmp{os.getpid()}_{threading.get_ident()}"
+    os.makedirs(tmp_path, exist_ok=True)
+    for sheet_name, df_sheet in sheets.items():
+        # Groupes de lignes de CHUNK_SIZE dates pour la lecture par blocs
+        prepare_columnar(df_sheet).to_parquet(
+            os.path.join(tmp_path, sheet_name + ".parquet"), index=False, row_group_size=CHUNK_SIZE
+        )
+    with open(os.path.join(tmp_path, SOURCE_FILE), "w", encoding="utf-8") as file:
+        file.write(os.path.abspath(path))
+    open(os.path.join(tmp_path, ".complete"), "w").close()
+
+    try:
+        os.rename(tmp_path, cache_path)
+    except OSError:
+        # Un autre processus a terminé l'ingestion avant celui-ci
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    clean_cache_root(cache_root, cache_path, os.path.abspath(path))
+
+    return cache_path
+
+
+# Nombre maximal de résultats conservés par fonction mise en cache
+CACHE_SIZE = 32
+
+
+# Décorateur qui met en cache les résultats d'une fonction selon ses arguments simples (ticker, année,
+# paramètres de stratégie) et la version du classeur, en évinçant les résultats les moins récemment utilisés.
+# Les données ne sont ni hachées ni copiées : les résultats partagés ne doivent pas être modifiés.
+def cache_by_key(maxsize=CACHE_SIZE):
+
+    def decorator(func):
+        # Échec du cache lors de l'appel en cours, propre à chaque thread (statistiques du profilage)
+        cache_miss = threading.local()
+
+        @functools.lru_cache(maxsize=maxsize)
+        def cached_func(workbook_key, *args, **kwargs):
+            result = func(*args, **kwargs)
+            # Marqué après les appels imbriqués à d'autres fonctions mises en cache
+            cache_miss.flag = True
+            return result
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_miss.flag = False
+            result = cached_func(get_workbook_key(), *args, **kwargs)
+            record_cache_call(not cache_miss.flag)
+            return result
+
+        wrapper.cache_info = cached_func.cache_info
+        wrapper.cache_clear = cached_func.cache_clear
+
+        return wrapper
+
+    return decorator
+
+
+# Fonction qui lit une feuille du classeur depuis le cache colonnaire
+@profile_stage()
+def read_sheet(sheet_name, path=None):
+    cache_path = ingest_workbook(path)
+    df_sheet = pd.read_parquet(os.path.join(cache_path, sheet_name + ".parquet"))
+
+    return df_sheet
+
+
+# Représentation compacte des prix (float32 mappé en mémoire), activée par la variable d'environnement COMPACT_PRICES=1
+COMPACT_PRICES = os.environ.get("COMPACT_PRICES") == "1"
+
+
+# Fonction qui crée et retraite un data frame à partir du prix des actions d'un indice
+@profile_stage()
+@cache_by_key()
+def get_df_prices(ticker, compact=None):
+    index_sheet = ticker + "_PX_LAST"
+
+    # Data frame construit sans copie sur la matrice float32 mappée en mémoire, dont les pages physiques
+    # sont partagées par toutes les sessions et tous les processus
+    if compact if compact is not None else COMPACT_PRICES:
+        prices, dates, tickers = get_prices_memmap(ticker, dtype=np.float32)
+        date_col = pq.read_schema(os.path.join(ingest_workbook(), index_sheet + ".parquet")).names[1]
+        df_prices = pd.DataFrame(prices, index=pd.DatetimeIndex(dates, name=date_col), columns=tickers, copy=False)
+
+        return df_prices
+
+    df_prices = read_sheet(index_sheet)
+
+    # Supprimer la première colonne et mettre les dates en indice
+    df_prices = df_prices.drop(df_prices.columns[0], axis=1)
+    df_prices = df_prices.set_index(df_prices.columns[0])
+
+    # Gestion des valeurs manquantes
+
+    # Suppression des colonnes dont la proportion de valeurs manquantes dépasse 10%
+    df_prices = df_prices.dropna(axis=1, thresh=0.9*len(df_prices))
+
+    # Remplacement des valeurs manquantes par la valeur précédente
+    df_prices = df_prices.ffill()
+
+    return df_prices
+
+
+# Nombre de dates lues à la fois par le chargement par blocs des prix
+CHUNK_SIZE = 1000
+
+
+# Fonction qui parcourt la feuille de prix d'un indice par blocs de dates depuis le cache colonnaire
+def iter_sheet_chunks(sheet_name, chunk_size=CHUNK_SIZE, columns=None):
+    parquet_file = pq.ParquetFile(os.path.join(ingest_workbook(), sheet_name + ".parquet"))
+
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield batch.to_pandas()
+
+
+# Fonction qui parcourt les prix retraités d'un indice par blocs de dates, sans charger toute la feuille en mémoire
+def iter_df_prices(ticker, chunk_size=CHUNK_SIZE):
+    index_sheet = ticker + "_PX_LAST"
+    parquet_file = pq.ParquetFile(os.path.join(ingest_workbook(), index_sheet + ".parquet"))
+    n_dates = parquet_file.metadata.num_rows
+
+    # Comme dans get_df_prices : la première colonne est supprimée et la deuxième contient les dates
+    date_col, price_cols = parquet_file.schema_arrow.names[1], parquet_file.schema_arrow.names[2:]
+
+    # Premier passage : nombre de valeurs non manquantes par titre
+    counts = pd.Series(0, index=price_cols)
+    for df_chunk in iter_sheet_chunks(index_sheet, chunk_size, price_cols):
+        counts += df_chunk.notna().sum()
+
+    # Suppression des colonnes dont la proportion de valeurs manquantes dépasse 10%
+    kept_cols = counts.index[counts >= 0.9 * n_dates].tolist()
+
+    # Second passage : remplacement des valeurs manquantes par la valeur précédente, y compris d'un bloc à l'autre
+    last_values = None
+    for df_chunk in iter_sheet_chunks(index_sheet, chunk_size, [date_col] + kept_cols):
+        df_chunk = df_chunk.set_index(date_col)
+        if last_values is not None:
+            df_chunk.iloc[0] = df_chunk.iloc[0].fillna(last_values)
+        df_chunk = df_chunk.ffill()
+        last_values = df_chunk.iloc[-1]
+
+        yield df_chunk
+
+
+# Fonction qui écrit les prix retraités d'un indice dans une matrice mappée en mémoire, bloc par bloc
+# (float32 pour diviser par deux la mémoire, au prix d'une précision relative d'environ 1e-7)
+def get_prices_memmap(ticker, chunk_size=CHUNK_SIZE, dtype=np.float64):
+    cache_path = ingest_workbook()
+    matrix_file = os.path.join(cache_path, f"{ticker}_PX_LAST_{np.dtype(dtype).name}.npy")
+    dates_file = os.path.join(cache_path, ticker + "_PX_LAST_dates.npy")
+    tickers_file = os.path.join(cache_path, ticker + "_PX_LAST_tickers.npy")
+
+    if not os.path.exists(matrix_file):
+        n_dates = pq.ParquetFile(os.path.join(cache_path, ticker + "_PX_LAST.parquet")).metadata.num_rows
+        suffix = f".tmp{os.getpid()}_{threading.get_ident()}.npy"
+        tmp_file = matrix_file + suffix
+
+        matrix, dates, row = None, [], 0
+        for df_chunk in iter_df_prices(ticker, chunk_size):
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(tmp_file, mode="w+", dtype=dtype, shape=(n_dates, df_chunk.shape[1]))
+                tickers = df_chunk.columns.to_numpy(dtype=str)
+            matrix[row:row + len(df_chunk)] = df_chunk.to_numpy(dtype=dtype)
+            dates.append(df_chunk.index.to_numpy())
+            row += len(df_chunk)
+
+        matrix.flush()
+        del matrix
+
+        # Dates et titres écrits dans des fichiers temporaires renommés avant la matrice, dont le renommage marque la
+        # fin de l'écriture : un autre processus ne lit jamais de fichier incomplet ou écrit par un autre processus
+        np.save(dates_file + suffix, np.concatenate(dates))
+        np.save(tickers_file + suffix, tickers)
+        os.replace(dates_file + suffix, dates_file)
+        os.replace(tickers_file + suffix, tickers_file)
+        os.replace(tmp_file, matrix_file)
+
+    # Matrice en lecture seule partagée par le cache de pages du système
+    return np.load(matrix_file, mmap_mode="r"), np.load(dates_file), np.load(tickers_file)
+
+
+# Fonction qui crée des séries de prix pour différents intervalles de temps
+def get_prices_series(df_prices, interval):
+    index_prices_interval = df_prices[(df_prices.index.year >= interval[0]) & (df_prices.index.year <= interval[1])]
+
+    return index_prices_interval
+
+
+# Fonction qui crée des séries de prix pour différents intervalles de temps (semestriellement)
+def get_prices_series_semi(df_prices, interval):
+    # Filtrage par intervalle d'années
+    index_prices_interval = df_prices[(df_prices.index.year >= interval[0]) & (df_prices.index.year <= interval[1])]
+    
+    # Série pour les 6 premiers mois
+    first_half = index_prices_interval[index_prices_interval.index.month <= 6]
+    
+    # Série pour les 6 derniers mois
+    second_half = index_prices_interval[index_prices_interval.index.month > 6]
+    
+    return first_half, second_half
+
+
+# Préfixe des feuilles de données qualitatives (une feuille par année : Qualitativ_2018, Qualitativ_2019...)
+QUALITATIVE_PREFIX = "Qualitativ_"
+
+# Fichier de la table point-in-time des données qualitatives, dans le cache colonnaire du classeur (le numéro de
+# version invalide les tables écrites dans un format précédent)
+QUALITATIVE_TABLE = "qualitatif_pit_v2.parquet"
+
+# Données qualitatives point-in-time : dates de disponibilité des instantanés, titres, champs, valeurs numériques
+# (instantanés x titres x champs), valeurs textuelles par champ (instantanés x titres) et présence des titres
+QualitativeStore = namedtuple("QualitativeStore", ["dates", "tickers", "fields", "values", "texts", "present"])
+
+
+# Fonction qui fusionne toutes les feuilles qualitatives en une seule table longue (titre, date de disponibilité,
+# champ, valeur numérique, valeur textuelle), écrite une seule fois dans le cache colonnaire du classeur
+@profile_stage()
+def build_qualitative_table(path=None):
+    cache_path = ingest_workbook(path)
+    table_path = os.path.join(cache_path, QUALITATIVE_TABLE)
+    if os.path.exists(table_path):
+        return pd.read_parquet(table_path)
+
+    sheets = sorted(
+        name[:-len(".parquet")] for name in os.listdir(cache_path)
+        if name.startswith(QUALITATIVE_PREFIX) and name.endswith(".parquet")
+    )
+
+    tables = []
+    for sheet_name in sheets:
+        df_sheet = read_sheet(sheet_name, path)
+        df_sheet = df_sheet.rename(columns={df_sheet.columns[0]: "ticker"})
+        df_sheet = df_sheet.dropna(subset="ticker").drop_duplicates("ticker")
+
+        # Les données d'une année sont disponibles à partir du 1er janvier de cette année
+        df_long = df_sheet.melt(id_vars="ticker", var_name="field", value_name="raw")
+        df_long.insert(1, "as_of", pd.Timestamp(int(sheet_name[len(QUALITATIVE_PREFIX):]), 1, 1))
+
+        tables.append(df_long)
+
+    df_table = pd.concat(tables, ignore_index=True)
+
+    # Type de chaque champ décidé sur toutes les années à la fois, comme pour une colonne d'une feuille (une année
+    # où les valeurs d'un champ numérique sont des marqueurs d'erreur est restée textuelle dans sa feuille) : les champs
+    # numériques dans "value", les champs textuels dans "text"
+    raw = df_table["raw"]
+    df_counts = pd.DataFrame({
+        "field": df_table["field"],
+        "numbers": pd.to_numeric(raw, errors="coerce").notna(),
+        "markers": raw.map(lambda v: isinstance(v, str) and v.startswith(ERROR_MARKER_PREFIX)),
+        "filled": raw.notna()
+    }).groupby("field", sort=False).sum()
+    numeric_fields = [
+        field for field, counts in df_counts.iterrows()
+        if is_numeric_column(counts["numbers"], counts["markers"], counts["filled"])
+    ]
+    is_numeric = df_table["field"].isin(numeric_fields)
+    df_table["value"] = pd.to_numeric(raw.where(is_numeric), errors="coerce").astype(float)
+    df_table["text"] = raw.where(~is_numeric).astype("string")
+    df_table = df_table.drop(columns="raw")
+    df_table["ticker"] = df_table["ticker"].astype(str).astype("category")
+    # Les champs gardent l'ordre des colonnes des feuilles
+    df_table["field"] = pd.Categorical(df_table["field"], categories=pd.unique(df_table["field"]))
+
+    # Écriture dans un fichier temporaire renommé à la fin, pour les processus qui la construisent en parallèle
+    tmp_path = f"{table_path}.tmp{os.getpid()}_{threading.get_ident()}"
+    df_table.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, table_path)
+
+    return df_table
+
+
+# Fonction qui construit les tableaux des données qualitatives point-in-time à partir de la table longue
+def build_qualitative_store(df_table):
+    dates = pd.DatetimeIndex(sorted(df_table["as_of"].unique()))
+    tickers = pd.Index(df_table["ticker"].cat.categories)
+    fields = pd.Index(df_table["field"].cat.categories)
+
+    # Positions de chaque ligne de la table dans les tableaux
+    date_positions = dates.get_indexer(df_table["as_of"])
+    ticker_positions = df_table["ticker"].cat.codes.to_numpy()
+    field_positions = df_table["field"].cat.codes.to_numpy()
+
+    values = np.full((len(dates), len(tickers), len(fields)), np.nan)
+    values[date_positions, ticker_positions, field_positions] = df_table["value"].to_numpy(dtype=float, na_value=np.nan)
+
+    present = np.zeros((len(dates), len(tickers)), dtype=bool)
+    present[date_positions, ticker_positions] = True
+
+    texts = {}
+    df_texts = df_table[df_table["text"].notna()]
+    for field, df_field in df_texts.groupby("field", observed=True):
+        texts[field] = np.full((len(dates), len(tickers)), None, dtype=object)
+        texts[field][dates.get_indexer(df_field["as_of"]), df_field["ticker"].cat.codes.to_numpy()] = (
+            df_field["text"].to_numpy(dtype=object)
+        )
+
+    return QualitativeStore(dates, tickers, fields, values, texts, present)
+
+
+# Fonction qui renvoie les données qualitatives point-in-time de toutes les années, lues en une seule fois
+@profile_stage()
+@cache_by_key()
+def get_qualitative_store():
+    return build_qualitative_store(build_qualitative_table())
+
+
+# Fonction qui renvoie les années des données qualitatives disponibles
+def get_qualitative_years():
+    return [date.year for date in get_qualitative_store().dates]
+
+
+# Fonction qui renvoie, pour chaque date, la position du dernier instantané disponible à cette date
+# (le premier instantané pour les dates antérieures, comme get_year_as_of)
+def get_snapshot_positions(qualitative_store, dates):
+    positions = qualitative_store.dates.searchsorted(pd.DatetimeIndex(dates), side="right") - 1
+
+    return np.maximum(positions, 0)
+
+
+# Fonction qui renvoie les valeurs d'un champ disponibles à chaque date pour une liste de titres (matrice dates x
+# titres) : valeurs numériques, ou valeurs textuelles pour les champs textuels (pays, secteur...)
+def get_qualitative_as_of_dates(qualitative_store, dates, field, tickers):
+    positions = get_snapshot_positions(qualitative_store, dates)
+    ticker_positions = qualitative_store.tickers.get_indexer(tickers)
+    found = ticker_positions >= 0
+
+    if field in qualitative_store.texts:
+        values = np.full((len(positions), len(ticker_positions)), None, dtype=object)
+        values[:, found] = qualitative_store.texts[field][positions][:, ticker_positions[found]]
+    else:
+        values = np.full((len(positions), len(ticker_positions)), np.nan)
+        field_position = qualitative_store.fields.get_loc(field)
+        values[:, found] = qualitative_store.values[positions][:, ticker_positions[found], field_position]
+
+    return values
+
+
+# Fonction qui renvoie la dernière année de données qualitatives disponible à une date donnée
+def get_year_as_of(df_qualitative_years, date):
+    available_years = [year for year in df_qualitative_years if year <= date.year]
+
+    return max(available_years) if available_years else min(df_qualitative_years)
+
+
+# Fonction qui crée un dataframe des données qualitatives des titres de l'indice sélectionné
+@profile_stage()
+@cache_by_key()
+def get_df_qualitative(ticker, year):
+    qualitative_store = get_qualitative_store()
+    snapshot = qualitative_store.dates.get_loc(pd.Timestamp(year, 1, 1))
+
+    # Titres de l'instantané de l'année qui ont des prix dans l'univers
+    titles = qualitative_store.tickers[qualitative_store.present[snapshot]]
+    common_titles = get_df_prices(ticker).columns.intersection(titles)
+    ticker_positions = qualitative_store.tickers.get_indexer(common_titles)
+
+    df_qualitative = pd.DataFrame({
+        field: qualitative_store.texts[field][snapshot, ticker_positions] if field in qualitative_store.texts
+        else qualitative_store.values[snapshot, ticker_positions, position]
+        for position, field in enumerate(qualitative_store.fields)
+    }, index=common_titles)
+
+    return df_qualitative
+
+
+# Fonction qui extrait la liste triée des pays présents dans les données qualitatives d'une année
+@cache_by_key()
+def get_countries(year):
+    qualitative_store = get_qualitative_store()
+    snapshot = qualitative_store.dates.get_loc(pd.Timestamp(year, 1, 1))
+    countries = qualitative_store.texts["COUNTRY"][snapshot]
+    countries_list = sorted({country for country in countries if country is not None})
+
+    return countries_list
+
+
+# Fonction qui extrait les données du facteur qualitatif numérique sélectionné
+def get_indicator_data_num(df_qualitative, indicator):
+    indicator_data = df_qualitative[indicator]
+    indicator_data = indicator_data[pd.to_numeric(indicator_data, errors='coerce').notna()]
+
+    return indicator_data
+
+
+# Fonction qui extrait les données du facteur qualitatif sélectionné
+def get_indicator_data(df_qualitative, indicator):
+    indicator_data = df_qualitative[indicator]
+
+    return indicator_data
+
+
+# Fonction qui extrait les données qualitatives du pays sélectionné (ou d'une liste de pays)
+def filter_qualitative_by_country(qualitative_data, country_target):
+    countries = [country_target] if isinstance(country_target, str) else list(country_target)
+    
+    # Filtrer les données qualitatives pour ne garder que les actions du pays cible
+    qualitative_data_filtered = qualitative_data[qualitative_data["COUNTRY"].isin(countries)]
+
+    return qualitative_data_filtered
+
+
+# Fonction qui construit l'index des titres par valeur d'un champ textuel des données qualitatives (pays, secteur...)
+def build_members_index(df_qualitative, field="COUNTRY"):
+    # Regroupement sur les codes catégoriels du champ, calculés une seule fois
+    groups = df_qualitative.groupby(df_qualitative[field].astype("category"), observed=True).indices
+    members_index = {value: df_qualitative.index[positions] for value, positions in groups.items()}
+
+    return members_index
+
+
+# Fonction qui renvoie l'index des titres par valeur d'un champ pour un univers et une année
+@cache_by_key()
+def get_members_index(ticker, year, field="COUNTRY"):
+    return build_members_index(get_df_qualitative(ticker, year), field)
+
+
+# Fonction qui renvoie les titres correspondant à une valeur ou à une liste de valeurs (plusieurs pays, région)
+def get_members(members_index, values):
+    values = [values] if isinstance(values, str) else list(values)
+    members = [members_index[value] for value in values if value in members_index]
+
+    return members[0].append(members[1:]) if members else pd.Index([])
+
+
+# Fonction qui extrait les prix des actions du pays sélectionné
+def filter_prices_by_country(prices, qualitative_data_filtered):   
+    # Filtrer les prix pour ne garder que les actions dont le nom est en commun avec les données qualitatives filtrées
+    prices_filtered = prices[prices.columns.intersection(qualitative_data_filtered.index)]
+
+    return prices_filtered
+
+
+# Fonction qui extrait les prix de l'indice de référence
+@profile_stage()
+@cache_by_key()
+def get_reference_prices(ticker):
+    
+    df_indices = read_sheet("Index")
+
+    
+    col_name = ticker + " Index" 
+    col_idx = df_indices.columns.get_loc(col_name)
+
+
+    df_reference_prices = df_indices.iloc[:, [col_idx - 1, col_idx]]
+    df_reference_prices = df_reference_prices.set_index(df_reference_prices.columns[0])
+    df_reference_prices = df_reference_prices.sort_index()
+
+    return df_reference_prices
+
+
+# Fonction qui extrait les données Forex
+@profile_stage()
+@cache_by_key()
+def get_forex_data():
+    df_forex = read_sheet("Forex")
+
+    df_forex = df_forex.drop(df_forex.columns[0], axis=1)
+    df_forex = df_forex.set_index(df_forex.columns[0])
+
+    return df_forex
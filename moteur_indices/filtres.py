@@ -0,0 +1,55 @@
+"""
+Fonctions de création de filtrage des données
+
+Ces fonctions permettent de filtrer les données pour la création des indices ainsi que des éléments de traitement
+des tableaux permettre leur utilisation.
+"""
+
+# Importation des packages nécessaires
+import pandas as pd
+
+
+# Fonction qui extrait les titres correspondant à un certain quantile d'une série
+def get_percentile(df_values, percentile):
+    quantile = df_values.quantile(percentile)
+    df_percentile = df_values[(df_values >= quantile)]
+    
+    return df_percentile
+    
+
+# Fonction qui détermine les titres qui appartiennent à deux séries
+def get_intersection(df1, df2):
+    df_intersection = df1.index.intersection(df2.index)
+
+    return df_intersection
+
+
+# Fonction qui permet de réduire une série pour qu'elle corresponde aux indices d'une série index
+def reduce_series(df, df_ref):
+    existing_indices = [i for i in df_ref if i in df.index]
+
+    # Réduire le DataFrame/Série aux indices valides
+    df_reduced = df.loc[existing_indices]
+
+    return df_reduced
+
+
+# Fonction qui renvoie un dataframe avec les éléments de deux séries avec les mêmes indices
+def get_common_elements(df1, df2):
+    df_common = pd.merge(df1, df2, left_index=True, right_index=True, how="inner")
+
+    return df_common
+
+
+# Fonction qui détermine les poids des titres dans un indice selon la capitalisation boursière
+def calculate_weights(df_capitalization):
+    df_weights = df_capitalization / df_capitalization.sum()
+
+    return df_weights
+
+# Fonction qui détermine les 100 titres les plus performants
+def selection_top_100_returns(df_returns):
+    
+    top_100_returns = df_returns.sum().nlargest(100)
+    
+    return top_100_returns.index.tolist()
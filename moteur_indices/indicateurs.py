@@ -0,0 +1,163 @@
+"""
+Fonctions de calcul des indicateurs de performance
+
+Ces fonctions calculent les indicateurs de performance et de risque (performance, volatilité, max drawdown, Sharpe,
+beta et alpha) de toutes les colonnes d'une matrice de séries en une seule passe numpy, par exemple toutes les
+stratégies x devises x pays d'un sweep. Le beta et l'alpha sont obtenus par la covariance (formule fermée de la
+régression linéaire), sans statsmodels. Les indicateurs glissants sont calculés par différences de sommes cumulées,
+en O(n) quelle que soit la taille de la fenêtre.
+"""
+
+# Importation des packages nécessaires
+import numpy as np
+import pandas as pd
+
+from .profilage import profile_stage
+
+# Nombre de jours de cotation par an pour l'annualisation
+TRADING_DAYS = 252
+
+# Indicateurs exprimés en pourcentage
+PERCENT_INDICATORS = ["Performance Totale", "Performance Annualisée", "Max Drawdown", "Volatilité Annualisée"]
+
+# Fenêtres des indicateurs glissants, en jours de cotation (environ 3, 6 et 12 mois)
+ROLLING_WINDOWS = [63, 126, 252]
+
+
+# Fonction qui renvoie la première et la dernière valeur renseignée de chaque colonne d'une matrice
+def get_first_last_values(values):
+    valid = ~np.isnan(values)
+    columns = np.arange(values.shape[1])
+    first = values[valid.argmax(axis=0), columns]
+    last = values[len(values) - 1 - valid[::-1].argmax(axis=0), columns]
+
+    return first, last
+
+
+# Fonction qui calcule les indicateurs de toutes les colonnes d'une matrice de séries par rapport à leur référence
+# (une série commune à toutes les colonnes, ou une matrice de références avec les mêmes colonnes)
+@profile_stage()
+def compute_indicators(df_indices: pd.DataFrame, df_references, risk_free_rate=0.01):
+    prices = df_indices.to_numpy(dtype=np.float64)
+    if isinstance(df_references, pd.Series):
+        # Une seule référence : diffusée sur toutes les colonnes sans copie
+        reference_prices = df_references.reindex(df_indices.index).to_numpy(dtype=np.float64)[:, None]
+    else:
+        reference_prices = df_references.reindex(index=df_indices.index, columns=df_indices.columns).to_numpy(
+            dtype=np.float64
+        )
+
+    # Performance totale entre la première et la dernière valeur de chaque série
+    first, last = get_first_last_values(prices)
+    total_performance = (last - first) / first * 100
+
+    # Rendements journaliers (NaN là où une des deux valeurs manque)
+    returns = prices[1:] / prices[:-1] - 1
+    reference_returns = reference_prices[1:] / reference_prices[:-1] - 1
+
+    # Performance et volatilité annualisées
+    annual_performance = ((1 + np.nanmean(returns, axis=0)) ** TRADING_DAYS - 1) * 100
+    annual_volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS) * 100
+
+    # Max drawdown par rapport au plus haut atteint
+    cumulative_max = np.fmax.accumulate(prices, axis=0)
+    max_drawdown = np.nanmin((prices - cumulative_max) / cumulative_max, axis=0) * 100
+
+    # Ratio de Sharpe
+    sharpe_ratio = (annual_performance - risk_free_rate) / annual_volatility
+
+    # Beta et alpha sur les dates où les deux rendements existent : beta = cov(indice, référence) / var(référence)
+    common = ~np.isnan(returns) & ~np.isnan(reference_returns)
+    count = common.sum(axis=0)
+    returns = np.where(common, returns, 0)
+    reference_returns = np.where(common, reference_returns, 0)
+    mean_returns = returns.sum(axis=0) / count
+    mean_reference = reference_returns.sum(axis=0) / count
+    centered_reference = np.where(common, reference_returns - mean_reference, 0)
+    covariance = (centered_reference * (returns - mean_returns)).sum(axis=0)
+    beta = covariance / (centered_reference ** 2).sum(axis=0)
+    alpha = (mean_returns - beta * mean_reference) * TRADING_DAYS  # Annualisé
+
+    return pd.DataFrame({
+        "Performance Totale": total_performance,
+        "Performance Annualisée": annual_performance,
+        "Max Drawdown": max_drawdown,
+        "Volatilité Annualisée": annual_volatility,
+        "Ratio de Sharpe": sharpe_ratio,
+        "Beta": beta,
+        "Alpha": alpha
+    }, index=df_indices.columns)
+
+
+# Fonction qui met en forme les indicateurs pour l'affichage (arrondis, pourcentages)
+def format_indicators(df_indicators: pd.DataFrame):
+    df_formatted = df_indicators.round(2).astype(object)
+    df_formatted["Alpha"] = df_indicators["Alpha"].round(4)
+    for name in PERCENT_INDICATORS:
+        df_formatted[name] = [f"{value}%" for value in df_indicators[name].round(2)]
+
+    return df_formatted
+
+
+# Fonction qui calcule les indicateurs de performance et de risque d'un indice par rapport à sa référence
+def calculer_indicateurs(df_indice: pd.Series, df_reference: pd.Series, risk_free_rate=0.01):
+    df_indicators = compute_indicators(df_indice.to_frame(), df_reference, risk_free_rate)
+
+    return format_indicators(df_indicators).iloc[0].to_dict()
+
+
+# Fonction qui renvoie les sommes cumulées d'un vecteur précédées d'un zéro : la somme des lignes a à b vaut
+# cumsum[b + 1] - cumsum[a]
+def prefix_sum(values):
+    return np.concatenate([[0.0], np.cumsum(values)])
+
+
+# Fonction qui calcule le drawdown courant d'une série (en %) par rapport au plus haut atteint
+def compute_drawdown(df_indice: pd.Series):
+    cumulative_max = df_indice.cummax()
+
+    return (df_indice - cumulative_max) / cumulative_max * 100
+
+
+# Fonction qui calcule la volatilité, le ratio de Sharpe et le beta d'une série sur une fenêtre glissante de
+# "window" rendements quotidiens, à partir des sommes cumulées des rendements de la série et de sa référence
+@profile_stage()
+def compute_rolling_indicators(df_indice: pd.Series, df_reference: pd.Series, window=252, risk_free_rate=0.01):
+    prices = df_indice.to_numpy(dtype=np.float64)
+    reference_prices = df_reference.reindex(df_indice.index).to_numpy(dtype=np.float64)
+
+    # Rendements journaliers alignés sur les dates (le premier n'existe pas), seuls les couples renseignés comptent
+    returns = np.concatenate([[np.nan], prices[1:] / prices[:-1] - 1])
+    reference_returns = np.concatenate([[np.nan], reference_prices[1:] / reference_prices[:-1] - 1])
+    valid = ~np.isnan(returns) & ~np.isnan(reference_returns)
+    returns = np.where(valid, returns, 0)
+    reference_returns = np.where(valid, reference_returns, 0)
+
+    # Sommes sur chaque fenêtre [t - window + 1, t] par différence des sommes cumulées
+    def window_sum(values):
+        sums = prefix_sum(values)
+        return np.concatenate([np.full(window, np.nan), sums[window + 1:] - sums[1:-window]])
+
+    n = window_sum(valid.astype(float))
+    total = window_sum(returns)
+    total_reference = window_sum(reference_returns)
+    total_squares = window_sum(returns ** 2)
+    total_reference_squares = window_sum(reference_returns ** 2)
+    total_products = window_sum(returns * reference_returns)
+
+    # Variances et covariance empiriques (ddof=1), non définies avec moins de deux rendements
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.where(n > 1, (total_squares - total ** 2 / n) / (n - 1), np.nan)
+        reference_variance = (total_reference_squares - total_reference ** 2 / n) / (n - 1)
+        covariance = (total_products - total * total_reference / n) / (n - 1)
+
+        volatility = np.sqrt(np.maximum(variance, 0)) * np.sqrt(TRADING_DAYS) * 100
+        annual_performance = ((1 + total / n) ** TRADING_DAYS - 1) * 100
+        sharpe_ratio = (annual_performance - risk_free_rate) / volatility
+        beta = covariance / reference_variance
+
+    return pd.DataFrame({
+        "Volatilité Annualisée": volatility,
+        "Ratio de Sharpe": sharpe_ratio,
+        "Beta": beta
+    }, index=df_indice.index)
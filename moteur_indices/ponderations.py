@@ -0,0 +1,256 @@
+"""
+Fonctions de pondération des titres
+
+Ces fonctions remplacent la pondération par la capitalisation boursière des stratégies par d'autres schémas : poids
+égaux, capitalisation plafonnée, inverse de la volatilité, variance minimale et parité de risque. Les schémas fondés
+sur la covariance utilisent une matrice de covariance des rendements rétrécie vers l'identité (Ledoit-Wolf).
+
+Les poids de toutes les périodes de rebalancement sont calculés en un seul lot : les titres sélectionnés à chaque
+période sont rangés dans des tableaux (périodes x titres) complétés à la taille de la plus grande sélection, et les
+solveurs travaillent sur tout le lot à la fois.
+"""
+
+# Importation des packages nécessaires
+import numpy as np
+import pandas as pd
+
+from .calculs import get_window_bounds
+from .profilage import profile_stage
+
+# Poids maximal d'un titre pour la pondération par capitalisation plafonnée
+WEIGHT_CAP = 0.10
+
+# Nombre maximal d'itérations du solveur de parité de risque
+MAX_ITERATIONS = 50
+
+# Tolérance sur les multiplicateurs des titres exclus du portefeuille de variance minimale (gradient Σy - 1)
+KKT_TOLERANCE = 1e-9
+
+
+# Fonction qui range les titres sélectionnés à chaque période dans un tableau (périodes x titres) complété :
+# positions des titres dans les colonnes et masque des cases occupées
+def get_selection_batch(df_weights_periods):
+    selected = df_weights_periods.to_numpy(dtype=float) > 0
+    n_max = max(selected.sum(axis=1).max(), 1)
+
+    positions = np.zeros((len(selected), n_max), dtype=int)
+    mask = np.zeros((len(selected), n_max), dtype=bool)
+    for row, columns in enumerate(selected):
+        columns = np.flatnonzero(columns)
+        positions[row, :len(columns)] = columns
+        mask[row, :len(columns)] = True
+
+    return positions, mask
+
+
+# Fonction qui range les rendements des titres sélectionnés sur la période d'observation de chaque période dans un
+# tableau (périodes x dates x titres) complété par des zéros, et renvoie le nombre de dates de chaque période
+def get_returns_batch(returns_store, calendar, positions, mask):
+    bounds = [get_window_bounds(returns_store, period.lookback_start, period.lookback_end) for period in calendar]
+    counts = np.array([last - first for first, last in bounds])
+
+    returns = np.zeros((len(calendar), max(counts.max(), 1), positions.shape[1]))
+    for row, (first, last) in enumerate(bounds):
+        returns[row, :last - first] = returns_store.returns[first:last][:, positions[row]]
+
+    # Rendements manquants ou titres absents : aucun rendement
+    returns = np.nan_to_num(returns, nan=0.0) * mask[:, None, :]
+
+    return returns, counts
+
+
+# Fonction qui calcule la covariance empirique des rendements de chaque période du lot
+def get_sample_covariance(returns, counts):
+    rows = np.arange(returns.shape[1])[None, :, None] < counts[:, None, None]
+    centered = (returns - returns.sum(axis=1, keepdims=True) / counts[:, None, None]) * rows
+
+    return np.einsum("kti,ktj->kij", centered, centered) / counts[:, None, None], centered
+
+
+# Fonction qui calcule la covariance rétrécie de Ledoit-Wolf (cible : variance moyenne x identité) de chaque période
+def get_shrunk_covariance(returns, counts, mask):
+    covariance, centered = get_sample_covariance(returns, counts)
+    n = mask.sum(axis=1)
+
+    # Cible : identité multipliée par la variance moyenne des titres sélectionnés
+    mean_variance = np.trace(covariance, axis1=1, axis2=2) / n
+    target = mean_variance[:, None, None] * (np.eye(mask.shape[1]) * mask[:, None, :])
+
+    # Intensité optimale du rétrécissement (normes de Frobenius divisées par le nombre de titres)
+    distance = ((covariance - target) ** 2).sum(axis=(1, 2)) / n
+    squared_norms = ((centered ** 2).sum(axis=2) ** 2).sum(axis=1)
+    dispersion = (squared_norms / counts - (covariance ** 2).sum(axis=(1, 2))) / (counts * n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shrinkage = np.where(distance > 0, np.minimum(dispersion, distance) / distance, 1.0)
+
+    return shrinkage[:, None, None] * target + (1 - shrinkage[:, None, None]) * covariance
+
+
+# Fonction qui rend inversibles les matrices du lot : identité sur les cases non occupées
+def complete_matrices(matrices, mask):
+    return matrices * mask[:, :, None] * mask[:, None, :] + np.eye(mask.shape[1]) * ~mask[:, None, :]
+
+
+# Fonction qui normalise les poids de chaque période pour que leur somme soit égale à 1
+def normalize_weights(weights, mask):
+    weights = np.where(mask, weights, 0.0)
+
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+# Fonction qui donne le même poids à tous les titres sélectionnés
+def equal_weights(capitalizations, returns, counts, mask):
+    return normalize_weights(np.ones(mask.shape), mask)
+
+
+# Fonction qui pondère par la capitalisation boursière plafonnée à WEIGHT_CAP, l'excédent des titres plafonnés étant
+# redistribué aux autres titres au prorata de leur poids jusqu'à ce qu'aucun poids ne dépasse le plafond
+def capped_weights(capitalizations, returns, counts, mask, cap=WEIGHT_CAP):
+    weights = normalize_weights(capitalizations, mask)
+
+    # Un plafond inférieur à 1 / nombre de titres ne peut pas être respecté : poids égaux dans ce cas
+    cap = np.maximum(cap, 1 / mask.sum(axis=1, keepdims=True))
+
+    for _ in range(mask.shape[1]):
+        excess = np.clip(weights - cap, 0, None).sum(axis=1, keepdims=True)
+        if excess.max() < 1e-12:
+            break
+        weights = np.minimum(weights, cap)
+        uncapped = np.where(mask & (weights < cap), weights, 0.0)
+        total_uncapped = uncapped.sum(axis=1, keepdims=True)
+        shares = np.divide(uncapped, total_uncapped, out=np.zeros_like(uncapped), where=total_uncapped > 0)
+        weights = weights + shares * excess
+
+    return weights
+
+
+# Fonction qui pondère les titres par l'inverse de leur volatilité sur la période d'observation
+def inverse_volatility_weights(capitalizations, returns, counts, mask):
+    covariance, centered = get_sample_covariance(returns, counts)
+    volatility = np.sqrt(np.diagonal(covariance, axis1=1, axis2=2))
+
+    with np.errstate(divide="ignore"):
+        return normalize_weights(np.where(volatility > 0, 1 / volatility, 0.0), mask)
+
+
+# Fonction qui calcule le portefeuille de variance minimale sans vente à découvert, pour toutes les périodes à la fois.
+# C'est la solution normalisée de min 1/2 y'Σy - somme(y) sous y >= 0, résolue par une méthode d'ensemble actif :
+# les titres de poids négatif de la solution sans contrainte sont d'abord retirés, puis chaque itération réintègre le
+# titre exclu dont le multiplicateur (gradient Σy - 1) est le plus négatif, en s'arrêtant sur le segment au premier
+# poids qui s'annule si la nouvelle solution n'est pas positive. Le résultat vérifie les conditions de Karush-Kuhn-
+# Tucker : gradient nul sur les titres détenus, positif ou nul sur les titres exclus
+def minimum_variance_weights(capitalizations, returns, counts, mask):
+    covariance = get_shrunk_covariance(returns, counts, mask)
+    rows = np.arange(len(mask))
+    free = mask.copy()
+
+    def solve(free):
+        return np.linalg.solve(complete_matrices(covariance, free), free.astype(float)[:, :, None])[:, :, 0]
+
+    # Point de départ admissible : chaque itération retire au moins un titre de poids négatif
+    for _ in range(mask.shape[1]):
+        y = solve(free)
+        negative = free & (y < 0)
+        if not negative.any():
+            break
+        free &= ~negative
+
+    for _ in range(3 * mask.shape[1]):
+        # Titre exclu de multiplicateur le plus négatif, réintégré dans chaque période qui ne vérifie pas les conditions
+        gradient = np.einsum("kij,kj->ki", covariance, y) - 1
+        candidates = np.where(mask & ~free, gradient, np.inf)
+        entering = candidates.argmin(axis=1)
+        improving = candidates[rows, entering] < -KKT_TOLERANCE
+        if not improving.any():
+            break
+        free[rows[improving], entering[improving]] = True
+
+        # Nouvelle solution sur les titres libres ; si des poids ne sont pas positifs, déplacement jusqu'au premier
+        # poids nul, dont le titre est retiré, et nouvelle résolution
+        for _ in range(mask.shape[1]):
+            target = solve(free)
+            blocking = free & (target <= 0)
+            if not blocking.any():
+                y = target
+                break
+            ratios = np.where(blocking, y / np.maximum(y - target, 1e-300), np.inf)
+            step = np.minimum(ratios.min(axis=1, keepdims=True), 1.0)
+            y = y + step * (target - y)
+            free &= ~(blocking & (ratios <= step))
+            y = np.where(free, y, 0.0)
+
+    return normalize_weights(y, free)
+
+
+# Fonction qui calcule le portefeuille de parité de risque (contributions au risque égales) par la méthode de Newton
+# appliquée à min 1/2 y'Σy - somme(log(y)) / n, dont la solution normalisée est le portefeuille recherché
+def risk_parity_weights(capitalizations, returns, counts, mask):
+    covariance = get_shrunk_covariance(returns, counts, mask)
+
+    # Mise à l'échelle de chaque matrice par sa variance moyenne pour le conditionnement du solveur
+    scale = np.trace(covariance, axis1=1, axis2=2) / mask.sum(axis=1)
+    covariance = covariance / scale[:, None, None]
+
+    budgets = mask / mask.sum(axis=1, keepdims=True)
+    variances = np.diagonal(covariance, axis1=1, axis2=2)
+    y = np.where(mask, 1 / np.sqrt(np.where(mask, variances, 1.0)), 1.0)
+
+    for _ in range(MAX_ITERATIONS):
+        gradient = np.where(mask, np.einsum("kij,kj->ki", covariance, y) - budgets / y, 0.0)
+        if np.abs(gradient).max() < 1e-12:
+            break
+        hessian = complete_matrices(covariance, mask) + np.eye(mask.shape[1]) * (budgets / y ** 2)[:, None, :]
+        step = np.linalg.solve(hessian, gradient[:, :, None])[:, :, 0]
+
+        # Pas réduit pour que tous les poids restent positifs
+        with np.errstate(divide="ignore", invalid="ignore"):
+            limits = np.where(mask & (step > 0), y / step, np.inf).min(axis=1, keepdims=True)
+        y = y - np.minimum(1.0, 0.95 * limits) * step
+
+    return normalize_weights(y, mask)
+
+
+# Schémas de pondération disponibles (la capitalisation boursière, pondération par défaut, est celle des stratégies)
+WEIGHTING_SCHEMES = {
+    "equal": equal_weights,
+    "capped": capped_weights,
+    "inverse-vol": inverse_volatility_weights,
+    "min-variance": minimum_variance_weights,
+    "risk-parity": risk_parity_weights,
+}
+
+
+# Fonction qui repondère les titres sélectionnés à toutes les périodes de rebalancement selon un schéma, en un seul lot
+# (les poids renvoyés sont, comme ceux des stratégies, multipliés par les prix pour obtenir la valeur de l'indice :
+# ils sont divisés par les prix de début de période pour que les poids réels au rebalancement soient ceux du schéma)
+@profile_stage()
+def get_scheme_weights(df_prices, df_weights_periods, calendar, returns_store, weighting):
+    positions, mask = get_selection_batch(df_weights_periods)
+    rows = np.arange(len(positions))[:, None]
+
+    capitalizations = df_weights_periods.to_numpy(dtype=float)[rows, positions]
+    returns, counts = get_returns_batch(returns_store, calendar, positions, mask)
+    weights = WEIGHTING_SCHEMES[weighting](capitalizations, returns, counts, mask)
+
+    starts = df_prices.index.get_indexer([period.start for period in calendar])
+    start_prices = df_prices.to_numpy()[starts[:, None], positions].astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        quantities = np.where(mask & (start_prices > 0), weights / start_prices, 0.0)
+
+    scheme_weights = np.zeros(df_weights_periods.shape)
+    np.add.at(scheme_weights, (np.broadcast_to(rows, positions.shape)[mask], positions[mask]), quantities[mask])
+
+    return pd.DataFrame(scheme_weights, index=df_weights_periods.index, columns=df_weights_periods.columns)
+
+
+# Fonction qui applique un schéma de pondération à la sélection d'une stratégie, période par période
+# (utilisée pour la mise à jour incrémentale, où seule la nouvelle période est pondérée)
+def weighting_strategy(strategy, returns_store, weighting):
+
+    def weighted_strategy(df_prices, period):
+        df_weights = strategy(df_prices, period).reindex(df_prices.columns).fillna(0)
+        df_weights_period = df_weights.to_frame(period.start).T
+
+        return get_scheme_weights(df_prices, df_weights_period, [period], returns_store, weighting).iloc[0]
+
+    return weighted_strategy
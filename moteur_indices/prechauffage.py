@@ -0,0 +1,97 @@
+"""
+Fonctions de préchauffage des résultats au démarrage de l'application
+
+Ces fonctions calculent en arrière-plan, dès le lancement du serveur streamlit, les résultats des configurations les
+plus consultées (les trois indices de l'application pour les deux univers, le pays le plus représenté pour l'indice
+géographique) : ils sont enregistrés dans le stockage des résultats et gardés dans les caches en mémoire, si bien que
+le premier visiteur de ces configurations n'attend plus leur calcul, quelle que soit la devise choisie (les résultats
+contiennent les séries et les indicateurs de toutes les devises, dont USD et EUR).
+
+Le préchauffage tourne dans un thread démon, lancé une seule fois par processus : il ne bloque pas l'affichage des
+pages, et une configuration demandée par un visiteur pendant le préchauffage est simplement calculée de son côté.
+"""
+
+# Importation des packages nécessaires
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .donnees import get_forex_data, get_reference_prices, get_members_index, get_countries
+from .backtest import START_YEAR, UNIVERSES, INDICES
+from .resultats import get_results, get_index_attribution
+
+logger = logging.getLogger(__name__)
+
+# Nombre de threads de préchauffage (un seul pour laisser la main aux sessions des visiteurs)
+WARMUP_WORKERS = 1
+
+# Thread de préchauffage du processus et avancement des configurations
+warmup_lock = threading.Lock()
+WARMUP_STATE = {"thread": None, "tasks": [], "done": [], "failed": []}
+
+
+# Fonction qui renvoie le pays le plus représenté d'un univers (indice géographique préchauffé)
+def get_main_country(ticker):
+    members_index = get_members_index(ticker, START_YEAR - 1)
+
+    return max(members_index, key=lambda country: len(members_index[country]))
+
+
+# Fonction qui liste les configurations préchauffées : univers x indice (x pays pour l'indice géographique)
+def get_warmup_tasks():
+    tasks = []
+    for ticker in UNIVERSES:
+        for indice in INDICES:
+            country = get_main_country(ticker) if indice == "Géographique" else None
+            tasks.append((ticker, indice, country))
+
+    return tasks
+
+
+# Fonction qui calcule les résultats d'une configuration et les données lues par les pages de l'application
+# (résultats et prix de référence de la visualisation et des indicateurs, attribution de la composition).
+# Les arguments sont passés comme par les pages, fréquence et pondération par défaut comprises, pour que les appels
+# des pages retrouvent les mêmes clés dans les caches en mémoire
+def warm_up_task(task):
+    ticker, indice, country = task
+    get_results(ticker, indice, country, None, None)
+    get_reference_prices(ticker)
+    get_index_attribution(ticker, indice, country, None, None)
+
+    return task
+
+
+# Fonction qui préchauffe toutes les configurations ; une erreur n'interrompt pas le préchauffage des autres
+def warm_up(tasks=None, workers=WARMUP_WORKERS):
+    get_forex_data()
+    get_countries(START_YEAR - 1)
+    tasks = get_warmup_tasks() if tasks is None else tasks
+    WARMUP_STATE["tasks"] = list(tasks)
+
+    def run(task):
+        try:
+            warm_up_task(task)
+            WARMUP_STATE["done"].append(task)
+        except Exception:
+            logger.exception("Échec du préchauffage de %s", task)
+            WARMUP_STATE["failed"].append(task)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prechauffage") as executor:
+        list(executor.map(run, tasks))
+
+
+# Fonction qui lance le préchauffage en arrière-plan, une seule fois par processus, et renvoie son thread
+def start_warmup(tasks=None, workers=WARMUP_WORKERS):
+    with warmup_lock:
+        if WARMUP_STATE["thread"] is None:
+            WARMUP_STATE["thread"] = threading.Thread(
+                target=warm_up, args=(tasks, workers), name="prechauffage", daemon=True
+            )
+            WARMUP_STATE["thread"].start()
+
+    return WARMUP_STATE["thread"]
+
+
+# Fonction qui renvoie l'avancement du préchauffage : configurations prêtes, en échec et au total
+def get_warmup_status():
+    return len(WARMUP_STATE["done"]), len(WARMUP_STATE["failed"]), len(WARMUP_STATE["tasks"])
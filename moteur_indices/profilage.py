@@ -0,0 +1,229 @@
+"""
+Fonctions de profilage des étapes du calcul des indices
+
+Ces fonctions mesurent, pour chaque étape instrumentée (lecture des données, backtest, conversion des devises,
+indicateurs, graphiques de l'application...), le nombre d'appels, la durée, les succès et échecs du cache et, si
+demandé, la mémoire allouée (tracemalloc). Le profilage est activé par la variable d'environnement PROFILING=1
+(PROFILE_MEMORY=1 pour la mémoire) ou par enable_profiling ; désactivé, un appel instrumenté ne coûte qu'un test.
+
+Les statistiques sont affichées dans le panneau de profilage de l'application ou écrites en json (une ligne par
+étape) pour les calculs en ligne de commande. Chaque appel est aussi journalisé en json au niveau DEBUG du logger
+moteur_indices.profilage.
+
+Les succès et échecs du cache sont relevés appel par appel par cache_by_key, dans chaque thread. La mémoire, mesurée
+par tracemalloc qui est global au processus, n'est en revanche valable que si un seul thread exécute des étapes
+instrumentées : une étape pendant laquelle un autre thread mesure aussi une étape (préchauffage, sessions simultanées)
+est comptée sans mémoire.
+"""
+
+# Importation des packages nécessaires
+import contextlib
+import datetime
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+# Profilage des étapes et suivi de la mémoire allouée, activés par les variables d'environnement
+PROFILING = os.environ.get("PROFILING") == "1"
+PROFILE_MEMORY = os.environ.get("PROFILE_MEMORY") == "1"
+
+logger = logging.getLogger(__name__)
+
+# Statistiques cumulées par étape, partagées par tous les threads (sessions streamlit)
+STAGE_STATS = {}
+stats_lock = threading.Lock()
+
+# Pile des mesures de mémoire des étapes imbriquées, propre à chaque thread
+memory_frames = threading.local()
+
+# Résultat (succès du cache ou non) du dernier appel à une fonction mise en cache, propre à chaque thread
+cache_calls = threading.local()
+
+# Threads qui mesurent la mémoire d'une étape (profondeur des étapes imbriquées) et nombre de chevauchements entre
+# threads : la mémoire d'une étape n'est valable que si aucun autre thread n'a mesuré d'étape pendant la sienne
+memory_threads = {}
+memory_overlaps = 0
+
+
+# Fonction qui active le profilage (et le suivi de la mémoire allouée, qui ralentit les calculs)
+def enable_profiling(memory=False):
+    global PROFILING
+    PROFILING = True
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+# Fonction qui désactive le profilage
+def disable_profiling():
+    global PROFILING
+    PROFILING = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+# Fonction qui indique si le profilage est activé
+def is_profiling_enabled():
+    return PROFILING
+
+
+# Fonction qui efface les statistiques accumulées
+def reset_profile():
+    with stats_lock:
+        STAGE_STATS.clear()
+
+
+# Fonction qui ajoute un appel aux statistiques d'une étape et le journalise
+def record_stage(name, seconds, cache_hit=None, allocated=None):
+    with stats_lock:
+        stats = STAGE_STATS.setdefault(name, {
+            "calls": 0, "seconds": 0.0, "max_seconds": 0.0, "cache_hits": 0, "cache_misses": 0, "peak_bytes": None
+        })
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if cache_hit is not None:
+            stats["cache_hits" if cache_hit else "cache_misses"] += 1
+        if allocated is not None:
+            stats["peak_bytes"] = max(stats["peak_bytes"] or 0, allocated)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({
+            "stage": name, "seconds": seconds, "cache_hit": cache_hit, "allocated_bytes": allocated
+        }, ensure_ascii=False))
+
+
+# Fonction qui enregistre le résultat d'un appel à une fonction mise en cache (appelée par cache_by_key)
+def record_cache_call(hit):
+    cache_calls.hit = hit
+
+
+# Fonction qui signale le début de la mesure de mémoire d'une étape par le thread courant ; renvoie le nombre de
+# chevauchements au début de l'étape, ou None si un autre thread mesurait déjà une étape
+def enter_memory_thread():
+    global memory_overlaps
+    thread = threading.get_ident()
+    with stats_lock:
+        others = any(other != thread for other in memory_threads)
+        if others and thread not in memory_threads:
+            memory_overlaps += 1
+        memory_threads[thread] = memory_threads.get(thread, 0) + 1
+
+        return None if others else memory_overlaps
+
+
+# Fonction qui signale la fin de la mesure de mémoire d'une étape ; indique si aucun autre thread n'a mesuré d'étape
+# depuis son début
+def leave_memory_thread(overlaps):
+    thread = threading.get_ident()
+    with stats_lock:
+        memory_threads[thread] -= 1
+        if not memory_threads[thread]:
+            del memory_threads[thread]
+
+        return overlaps is not None and overlaps == memory_overlaps
+
+
+# Gestionnaire de contexte qui mesure un bloc de code comme une étape
+# (cached : fonction mise en cache par cache_by_key, pour savoir si l'appel a été servi par le cache)
+@contextlib.contextmanager
+def profile_block(name, cached=False):
+    if not PROFILING:
+        yield
+        return
+
+    cache_calls.hit = None
+
+    # Mémoire : pic de l'étape par rapport à la mémoire allouée à son début, le pic des étapes englobantes étant
+    # conservé dans la pile avant chaque remise à zéro du pic de tracemalloc
+    memory = tracemalloc.is_tracing()
+    if memory:
+        overlaps = enter_memory_thread()
+        frames = memory_frames.__dict__.setdefault("stack", [])
+        current, peak = tracemalloc.get_traced_memory()
+        if frames:
+            frames[-1][1] = max(frames[-1][1], peak)
+        tracemalloc.reset_peak()
+        frames.append([current, current])
+
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        # Appel en erreur : ni succès ni échec du cache
+        cache_calls.hit = None
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+
+        # Résultat de l'appel enregistré par cache_by_key juste avant la fin du bloc
+        cache_hit = cache_calls.hit if cached else None
+
+        allocated = None
+        if memory:
+            start_current, peak = frames.pop()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if leave_memory_thread(overlaps):
+                allocated = peak - start_current
+            if frames:
+                frames[-1][1] = max(frames[-1][1], peak)
+            tracemalloc.reset_peak()
+
+        record_stage(name, seconds, cache_hit, allocated)
+
+
+# Décorateur qui mesure chaque appel d'une fonction comme une étape (placé au-dessus de cache_by_key, il compte aussi
+# les succès et échecs du cache)
+def profile_stage(name=None):
+
+    def decorator(func):
+        stage_name = name or func.__name__
+        cached = hasattr(func, "cache_clear")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILING:
+                return func(*args, **kwargs)
+            with profile_block(stage_name, cached):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Fonction qui renvoie les statistiques des étapes, de la plus coûteuse à la moins coûteuse
+def get_profile():
+    with stats_lock:
+        df_profile = pd.DataFrame.from_dict(
+            {name: dict(stats) for name, stats in STAGE_STATS.items()}, orient="index",
+            columns=["calls", "seconds", "max_seconds", "cache_hits", "cache_misses", "peak_bytes"]
+        )
+
+    df_profile["mean_ms"] = df_profile["seconds"] / df_profile["calls"] * 1000
+    df_profile["peak_mb"] = df_profile["peak_bytes"].astype(float) / 1024 ** 2
+
+    return df_profile.drop(columns="peak_bytes").sort_values("seconds", ascending=False).rename_axis("stage")
+
+
+# Fonction qui ajoute les statistiques des étapes à un fichier json (une ligne par étape)
+def write_profile_log(path, **context):
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+    with stats_lock:
+        lines = [
+            json.dumps({"timestamp": timestamp, "stage": name, **context, **stats}, ensure_ascii=False)
+            for name, stats in STAGE_STATS.items()
+        ]
+
+    with open(path, "a", encoding="utf-8") as file:
+        file.writelines(line + "\n" for line in lines)
+
+
+# Suivi de la mémoire demandé par la variable d'environnement
+if PROFILING and PROFILE_MEMORY:
+    enable_profiling(memory=True)
@@ -0,0 +1,235 @@
+"""
+Fonctions de définition des stratégies par des règles
+
+Ces fonctions permettent de décrire la sélection et la pondération des titres d'un nouvel indice par une
+spécification déclarative (dictionnaire python, fichier json ou yaml) plutôt que par du code. Par exemple, l'indice
+High vol PER s'écrit :
+
+    name: High vol PER
+    full_history_first: true          # première sélection sur tout l'historique de prix
+    select:
+      and:
+        - {factor: volatility, quantile: 0.4}
+        - {factor: PE_RATIO, quantile: 0.7}
+    weight: CUR_MKT_CAP
+
+Les facteurs sont calculés sur la période d'observation de chaque rebalancement (volatility, returns_sum,
+cumulative_returns) ou lus dans les données qualitatives (toute colonne des feuilles Qualitativ_AAAA). Les filtres
+disponibles sont : quantile (valeurs au-dessus du quantile), quantile_below, top, bottom, min, max et in (appartenance
+à une liste de pays, de secteurs...), combinés par and, or et not.
+
+Le calendrier de rebalancement est annuel par défaut ; il peut être précisé par une clé rebalancing (frequency,
+lookback, gap, et lookback_by_frequency pour les fréquences choisies dans l'application).
+
+La spécification est compilée en une sélection vectorisée : chaque facteur est une matrice (périodes x titres) pour
+toutes les dates de rebalancement à la fois, et chaque filtre un masque sur cette matrice.
+"""
+
+# Importation des packages nécessaires
+import json
+import numpy as np
+import pandas as pd
+
+from .donnees import get_qualitative_as_of_dates
+from .profilage import profile_stage
+
+# Facteurs calculés à partir des rendements sur la période d'observation
+RETURNS_FACTORS = ["volatility", "returns_sum", "cumulative_returns"]
+
+# Exemple de nouvel indice défini par des règles : titres peu volatils avec un PER faible
+LOW_VOL_PER_SPEC = {
+    "name": "Low vol PER",
+    "select": {"and": [
+        {"factor": "volatility", "quantile_below": 0.4},
+        {"factor": "PE_RATIO", "quantile_below": 0.5}
+    ]},
+    "weight": "CUR_MKT_CAP"
+}
+
+# Indices définis par des règles, proposés avec les indices de l'application
+STRATEGY_SPECS = {LOW_VOL_PER_SPEC["name"]: LOW_VOL_PER_SPEC}
+
+
+# Fonction qui lit une spécification de stratégie depuis un fichier json ou yaml
+def load_strategy_spec(path):
+    with open(path, encoding="utf-8") as file:
+        if path.endswith(".json"):
+            return json.load(file)
+
+        # Import à l'appel : pyyaml (requirements.txt) n'est chargé que pour les spécifications en yaml
+        import yaml
+
+        return yaml.safe_load(file)
+
+
+# Fonction qui ajoute une stratégie définie par des règles aux indices disponibles et renvoie son nom
+def register_strategy_spec(spec):
+    STRATEGY_SPECS[spec["name"]] = spec
+
+    return spec["name"]
+
+
+# Fonction qui calcule un facteur de rendements pour toutes les périodes à la fois (matrice périodes x titres)
+# à partir des sommes cumulées du store de rendements
+def get_returns_factor(returns_store, firsts, lasts, factor):
+    n = returns_store.count[lasts] - returns_store.count[firsts]
+    total = returns_store.sum[lasts] - returns_store.sum[firsts]
+
+    if factor == "returns_sum":
+        return total
+    if factor == "cumulative_returns":
+        return np.expm1(returns_store.sum_log[lasts] - returns_store.sum_log[firsts])
+
+    # Volatilité annuelle (variance empirique, ddof=1), non définie avec moins de deux rendements
+    total_squares = returns_store.sum_squares[lasts] - returns_store.sum_squares[firsts]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.where(n > 1, (total_squares - total ** 2 / n) / (n - 1), np.nan)
+
+    return np.sqrt(np.maximum(variance, 0)) * np.sqrt(252)
+
+
+# Fonction qui lit un champ des données qualitatives disponibles à la fin de la période d'observation de chaque
+# période (matrice périodes x titres) : valeurs numériques, ou valeurs brutes pour les filtres d'appartenance
+def get_qualitative_factor(qualitative_store, dates, columns, factor, numeric=True):
+    values = get_qualitative_as_of_dates(qualitative_store, dates, factor, columns)
+    if numeric and values.dtype == object:
+        return pd.DataFrame(values).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+    return values
+
+
+# Fonction qui calcule, ligne par ligne, le quantile des valeurs renseignées d'une matrice pour un seuil propre à chaque
+# ligne (interpolation linéaire, comme np.nanquantile)
+def get_row_quantiles(values, quantiles):
+    n = (~np.isnan(values)).sum(axis=1)
+    sorted_values = np.sort(values, axis=1)
+
+    positions = np.asarray(quantiles, dtype=float) * np.maximum(n - 1, 0)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(n - 1, 0))
+    fractions = positions - lower
+
+    rows = np.arange(len(values))
+    low, high = sorted_values[rows, lower], sorted_values[rows, upper]
+    quantile = np.where(fractions >= 0.5, high - (high - low) * (1 - fractions), low + (high - low) * fractions)
+
+    return np.where(n > 0, quantile, np.nan)[:, None]
+
+
+# Fonction qui renvoie le seuil d'un filtre quantile de chaque ligne : un seuil commun à toutes les lignes, ou un
+# seuil par ligne (tableau), par exemple pour les répliques perturbées de l'analyse de robustesse
+def get_quantile_thresholds(values, quantile):
+    if np.ndim(quantile) == 0:
+        return np.nanquantile(values, quantile, axis=1, keepdims=True)
+
+    return get_row_quantiles(values, quantile)
+
+
+# Fonction qui sélectionne, ligne par ligne, les n plus grandes valeurs renseignées d'une matrice
+# (à égalité, le premier titre est retenu, comme nlargest)
+def get_top_mask(values, n):
+    valid = ~np.isnan(values)
+    order = np.argsort(-np.where(valid, values, -np.inf), axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(values.shape[1])[None, :], axis=1)
+
+    return valid & (ranks < n)
+
+
+# Fonction qui compile une règle de sélection en une fonction qui renvoie le masque (périodes x titres) des titres
+# retenus à partir d'une fonction qui fournit les matrices de facteurs
+def compile_rule(rule):
+    if "and" in rule or "or" in rule:
+        combine = np.logical_and if "and" in rule else np.logical_or
+        rules = [compile_rule(sub_rule) for sub_rule in rule.get("and", rule.get("or"))]
+        return lambda get_factor: combine.reduce([sub_rule(get_factor) for sub_rule in rules])
+
+    if "not" in rule:
+        sub_rule = compile_rule(rule["not"])
+        return lambda get_factor: ~sub_rule(get_factor)
+
+    factor = rule.get("factor", rule.get("field"))
+
+    def select(get_factor):
+        if "in" in rule:
+            values = get_factor(factor, numeric=False)
+            members = rule["in"] if isinstance(rule["in"], list) else [rule["in"]]
+            return np.isin(values, members)
+
+        values = get_factor(factor)
+        valid = ~np.isnan(values)
+        if "quantile" in rule:
+            return valid & (values >= get_quantile_thresholds(values, rule["quantile"]))
+        if "quantile_below" in rule:
+            return valid & (values <= get_quantile_thresholds(values, rule["quantile_below"]))
+        if "top" in rule:
+            return get_top_mask(values, rule["top"])
+        if "bottom" in rule:
+            return get_top_mask(-values, rule["bottom"])
+
+        mask = valid
+        if "min" in rule:
+            mask = mask & (values >= rule["min"])
+        if "max" in rule:
+            mask = mask & (values <= rule["max"])
+        return mask
+
+    return select
+
+
+# Fonction qui calcule les poids des titres d'une stratégie définie par des règles pour une liste de périodes
+# d'observation (matrice lignes x titres) : les périodes d'un calendrier, ou celles de nombreuses répliques à la fois
+def get_spec_weights(spec, qualitative_store, returns_store, lookback_starts, lookback_ends):
+    columns = returns_store.tickers
+    lookback_starts = pd.DatetimeIndex(lookback_starts)
+    lookback_ends = pd.DatetimeIndex(lookback_ends)
+    firsts = returns_store.dates.searchsorted(lookback_starts, side="left") + 1
+    lasts = np.maximum(firsts, returns_store.dates.searchsorted(lookback_ends, side="right"))
+
+    # Chaque facteur n'est calculé qu'une fois, même s'il apparaît dans plusieurs règles
+    factors = {}
+
+    def get_factor(factor, numeric=True):
+        if (factor, numeric) not in factors:
+            if factor in RETURNS_FACTORS:
+                factors[factor, numeric] = get_returns_factor(returns_store, firsts, lasts, factor)
+            else:
+                factors[factor, numeric] = get_qualitative_factor(
+                    qualitative_store, lookback_ends, columns, factor, numeric
+                )
+        return factors[factor, numeric]
+
+    selected = compile_rule(spec["select"])(get_factor)
+
+    # Pondération par un facteur (capitalisation boursière...) ou poids égaux
+    if spec.get("weight", "equal") == "equal":
+        weights = selected.astype(float)
+    else:
+        weights = np.where(selected, get_factor(spec["weight"]), np.nan)
+
+    return np.nan_to_num(weights / np.nansum(weights, axis=1, keepdims=True), nan=0.0)
+
+
+# Fonction qui calcule les poids des titres à toutes les dates de rebalancement d'une stratégie définie par des règles
+# (dataframe périodes x titres, comme les poids des rebalancements de run_backtest)
+@profile_stage()
+def select_spec_weights(spec, qualitative_store, returns_store, calendar):
+    # Bornes des périodes d'observation de tous les rebalancements
+    lookback_starts = [
+        returns_store.dates[0] if spec.get("full_history_first") and period.number == 0 else period.lookback_start
+        for period in calendar
+    ]
+    lookback_ends = [period.lookback_end for period in calendar]
+    weights = get_spec_weights(spec, qualitative_store, returns_store, lookback_starts, lookback_ends)
+
+    return pd.DataFrame(weights, index=[period.start for period in calendar], columns=returns_store.tickers)
+
+
+# Fonction qui renvoie la stratégie d'un indice défini par des règles, période par période
+# (utilisée pour la mise à jour incrémentale, où seule la nouvelle période est sélectionnée)
+def spec_strategy(spec, qualitative_store, returns_store):
+
+    def strategy(df_prices, period):
+        return select_spec_weights(spec, qualitative_store, returns_store, [period]).iloc[0]
+
+    return strategy
@@ -0,0 +1,261 @@
+"""
+Fonctions de stockage des résultats
+
+Ces fonctions permettent d'enregistrer sur disque les indices calculés (valeurs dans toutes les devises, poids à chaque
+rebalancement et indicateurs de performance) afin qu'une nouvelle session ou un nouveau processus les relise sans
+recalcul. Les résultats sont rangés dans le cache colonnaire de la version courante du classeur : ils sont donc
+invalidés avec lui, et par RESULTS_VERSION lorsque les calculs changent.
+
+Les résultats enregistrés peuvent être prolongés avec les prix de fin de journée postérieurs au classeur, sans
+recalculer l'historique (update_results, commande update de la ligne de commande) : chaque mise à jour enregistre
+seulement ses nouvelles lignes, dans un sous-répertoire relu à la suite des résultats.
+"""
+
+# Importation des packages nécessaires
+from collections import namedtuple
+import hashlib
+import json
+import os
+import shutil
+import threading
+import pandas as pd
+
+from .donnees import cache_by_key, ingest_workbook, get_df_prices, get_reference_prices, get_forex_data
+from .calculs import CURRENCIES, convert_all_currencies
+from .indicateurs import compute_indicators
+from .regles import STRATEGY_SPECS
+from .backtest import (
+    COST_MODELS, run_backtest, append_prices, get_trades, get_cost_factors, get_calendar, replay_strategy,
+    get_index_values, update_index_values, get_index_currencies, get_complete_prices
+)
+from .profilage import profile_stage
+
+# Version des calculs : à incrémenter pour invalider les résultats enregistrés
+RESULTS_VERSION = 3
+
+# Résultats d'un indice : valeurs dans chaque devise, poids à chaque rebalancement, indicateurs par devise et prix
+# retraités depuis la dernière date du classeur (prolongés par les mises à jour, qui partent de leur dernière date)
+IndexResults = namedtuple("IndexResults", ["index", "weights", "indicators", "prices"])
+
+# Répertoire des mises à jour des résultats d'un indice (un sous-répertoire numéroté par mise à jour) et tables
+# prolongées par chaque mise à jour (les indicateurs, recalculés sur tout l'historique, sont remplacés)
+UPDATES_DIR = "mises_a_jour"
+APPENDED_TABLES = ["index", "weights", "prices"]
+
+
+# Fonction qui renvoie le répertoire des résultats d'un indice et les paramètres qui composent sa clé
+def get_results_path(ticker, indice, country=None, frequency=None, weighting=None):
+    params = {
+        "version": RESULTS_VERSION,
+        "ticker": ticker,
+        "indice": indice,
+        "country": list(country) if isinstance(country, tuple) else country,
+        "frequency": frequency,
+        "weighting": weighting,
+        "spec": STRATEGY_SPECS.get(indice)
+    }
+    key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+    return os.path.join(ingest_workbook(), "resultats", key), params
+
+
+# Fonction qui relit les tables des résultats d'un indice ou d'une de ses mises à jour
+def read_results_tables(path):
+    return {name: pd.read_parquet(os.path.join(path, name + ".parquet")) for name in IndexResults._fields}
+
+
+# Fonction qui écrit les tables des résultats d'un indice ou d'une de ses mises à jour
+def write_results_tables(path, results):
+    os.makedirs(path, exist_ok=True)
+    for name, df in results._asdict().items():
+        df.to_parquet(os.path.join(path, name + ".parquet"))
+
+
+# Fonction qui renvoie les mises à jour enregistrées des résultats d'un indice, dans l'ordre
+def get_update_names(results_path):
+    updates_path = os.path.join(results_path, UPDATES_DIR)
+    if not os.path.isdir(updates_path):
+        return []
+
+    return sorted(name for name in os.listdir(updates_path) if name.isdigit())
+
+
+# Fonction qui relit les résultats enregistrés d'un indice, prolongés par ses mises à jour (None s'ils n'existent pas)
+def load_results(results_path):
+    if not os.path.exists(os.path.join(results_path, ".complete")):
+        return None
+
+    tables = read_results_tables(results_path)
+    updates = [
+        read_results_tables(os.path.join(results_path, UPDATES_DIR, name)) for name in get_update_names(results_path)
+    ]
+    if updates:
+        for name in APPENDED_TABLES:
+            tables[name] = pd.concat([tables[name]] + [update[name] for update in updates])
+        tables["indicators"] = updates[-1]["indicators"]
+
+    return IndexResults(**tables)
+
+
+# Fonction qui enregistre les résultats d'un indice
+def save_results(results_path, params, results):
+    # Écriture dans un répertoire temporaire renommé à la fin, pour les processus qui calculent en parallèle
+    tmp_path = f"{results_path}.tmp{os.getpid()}_{threading.get_ident()}"
+    write_results_tables(tmp_path, results)
+    with open(os.path.join(tmp_path, "params.json"), "w", encoding="utf-8") as file:
+        json.dump(params, file, ensure_ascii=False)
+    open(os.path.join(tmp_path, ".complete"), "w").close()
+
+    try:
+        os.rename(tmp_path, results_path)
+    except OSError:
+        # Un autre processus a enregistré les mêmes résultats
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+# Fonction qui enregistre une mise à jour des résultats d'un indice (nouvelles lignes et indicateurs recalculés) à
+# la suite des précédentes, sans réécrire les résultats déjà enregistrés
+def save_update(results_path, update):
+    update_path = os.path.join(results_path, UPDATES_DIR, f"{len(get_update_names(results_path)) + 1:06d}")
+    tmp_path = f"{update_path}.tmp{os.getpid()}_{threading.get_ident()}"
+    write_results_tables(tmp_path, update)
+
+    try:
+        os.rename(tmp_path, update_path)
+    except OSError:
+        # Mise à jour enregistrée entre-temps par un autre processus : celle-ci partait de résultats périmés
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+# Fonction qui calcule les indicateurs d'un indice dans toutes les devises par rapport à sa référence
+def get_results_indicators(ticker, df_index_currencies):
+    df_reference_prices = get_reference_prices(ticker)
+
+    # Séries rebasées de l'indice et de sa référence dans chaque devise, puis indicateurs de toutes les devises en une passe
+    df_indices, df_references = {}, {}
+    for currency in CURRENCIES:
+        df_complete_prices = get_complete_prices(df_index_currencies[currency], df_reference_prices)
+        df_indices[currency] = df_complete_prices.iloc[:, 0]
+        df_references[currency] = df_complete_prices.iloc[:, 1]
+
+    return compute_indicators(pd.DataFrame(df_indices), pd.DataFrame(df_references))
+
+
+# Fonction qui assemble les résultats d'un indice à partir de ses valeurs dans toutes les devises, de ses poids et des
+# prix retraités depuis la dernière date du classeur
+def build_results(ticker, df_index_currencies, df_weights_periods, df_prices):
+    return IndexResults(
+        df_index_currencies, df_weights_periods, get_results_indicators(ticker, df_index_currencies), df_prices
+    )
+
+
+# Fonction qui calcule les résultats d'un indice
+@profile_stage()
+def compute_results(ticker, indice, country=None, frequency=None, weighting=None):
+    df_index_values, df_weights_periods = get_index_values(ticker, indice, country, frequency, weighting)
+    df_index_currencies = get_index_currencies(ticker, indice, country, frequency, weighting)
+
+    return build_results(ticker, df_index_currencies, df_weights_periods, get_df_prices(ticker).iloc[-1:])
+
+
+# Fonction qui renvoie les résultats d'un indice : relus sur disque s'ils existent, sinon calculés et enregistrés
+@profile_stage()
+@cache_by_key()
+def get_results(ticker, indice, country=None, frequency=None, weighting=None):
+    results_path, params = get_results_path(ticker, indice, country, frequency, weighting)
+
+    results = load_results(results_path)
+    if results is None:
+        results = compute_results(ticker, indice, country, frequency, weighting)
+        save_results(results_path, params, results)
+
+    return results
+
+
+# Fonction qui renvoie le calendrier de rebalancement des résultats d'un indice, sur les dates du classeur prolongées
+# par celles des mises à jour (une période par ligne de poids enregistrée)
+def get_results_calendar(ticker, indice, country=None, frequency=None, weighting=None):
+    results = get_results(ticker, indice, country, frequency, weighting)
+    dates = get_df_prices(ticker).index
+    dates = dates.append(results.prices.index[results.prices.index > dates[-1]])
+
+    return get_calendar(dates, indice, frequency)
+
+
+# Fonction qui renvoie les prix retraités de l'univers d'un indice prolongés par ceux de ses mises à jour
+def get_results_prices(ticker, results):
+    df_prices = get_df_prices(ticker)
+    if results.prices.index[-1] > df_prices.index[-1]:
+        df_prices = append_prices(df_prices, results.prices)
+
+    return df_prices
+
+
+# Fonction qui calcule la rotation de chaque rebalancement d'un indice et le facteur qui donne l'indice net de coûts
+# (indice net = indice brut x facteur, dans n'importe quelle devise) à partir des poids et des dates enregistrés, sans
+# nouvelle sélection des titres : seuls les prix des débuts et fins de période sont lus
+@profile_stage()
+@cache_by_key()
+def get_index_costs(ticker, indice, country=None, frequency=None, weighting=None, cost_model="bps", cost=0.0):
+    results = get_results(ticker, indice, country, frequency, weighting)
+    calendar = get_results_calendar(ticker, indice, country, frequency, weighting)
+
+    df_trades = get_trades(get_results_prices(ticker, results), results.weights, calendar)
+    costs = COST_MODELS[cost_model](cost)(df_trades)
+
+    return df_trades.abs().sum(axis=1), get_cost_factors(results.index["USD"], costs)
+
+
+# Fonction qui calcule l'attribution par titre d'un indice en reprenant les poids enregistrés de ses rebalancements
+@profile_stage()
+@cache_by_key()
+def get_index_attribution(ticker, indice, country=None, frequency=None, weighting=None):
+    results = get_results(ticker, indice, country, frequency, weighting)
+    calendar = get_results_calendar(ticker, indice, country, frequency, weighting)
+
+    # Les poids déjà calculés remplacent la stratégie : aucune nouvelle sélection de titres
+    df_index_values, df_weights_periods, index_attribution = run_backtest(
+        get_results_prices(ticker, results), calendar, replay_strategy(results.weights), True
+    )
+
+    return index_attribution
+
+
+# Fonction qui met à jour les résultats enregistrés d'un indice avec des prix de fin de journée postérieurs au
+# classeur (df_new_prices : dates x titres, un fichier quotidien ou toutes les dates depuis le classeur ; les dates
+# déjà intégrées par une mise à jour précédente sont ignorées). L'indice est prolongé à partir des derniers poids et
+# des prix enregistrés par la mise à jour précédente : seules les nouvelles dates sont converties dans les devises
+# (au dernier cours connu) et enregistrées, les indicateurs sont recalculés sur les dates communes avec la référence
+@profile_stage()
+def update_results(ticker, indice, df_new_prices, country=None, frequency=None, weighting=None):
+    results_path, params = get_results_path(ticker, indice, country, frequency, weighting)
+    results = get_results(ticker, indice, country, frequency, weighting)
+    last_date = results.index.index[-1]
+
+    # Valeurs de l'indice dans sa devise de calcul (USD), prolongées à partir des derniers poids enregistrés
+    df_index_values, df_weights_periods, df_prices = update_index_values(
+        results.index["USD"], results.weights, results.prices, df_new_prices, ticker, indice, country, frequency,
+        weighting
+    )
+    df_new_values = df_index_values[df_index_values.index > last_date]
+    if df_new_values.empty:
+        return results
+
+    df_new_currencies = convert_all_currencies(df_new_values, get_forex_data())
+    df_index_currencies = pd.concat([results.index, df_new_currencies])
+    update = IndexResults(
+        df_new_currencies,
+        df_weights_periods.iloc[len(results.weights):],
+        get_results_indicators(ticker, df_index_currencies),
+        df_prices[df_prices.index > results.prices.index[-1]]
+    )
+    save_update(results_path, update)
+
+    # Les résultats en mémoire de ce processus, et ce qui en est déduit, sont relus sur disque au prochain appel
+    for function in [get_results, get_index_costs, get_index_attribution]:
+        function.cache_clear()
+
+    return IndexResults(
+        df_index_currencies, df_weights_periods, update.indicators, pd.concat([results.prices, update.prices])
+    )
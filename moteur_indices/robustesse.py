@@ -0,0 +1,268 @@
+"""
+Fonctions d'analyse de robustesse des indices
+
+Ces fonctions donnent des intervalles de confiance pour les indicateurs de performance et de risque d'un indice, à
+partir de milliers de répliques obtenues par deux méthodes :
+- le bootstrap par blocs des rendements quotidiens de l'indice et de sa référence (les mêmes blocs de dates sont
+  tirés pour les deux séries, ce qui conserve l'autocorrélation des rendements et leur lien avec la référence) ;
+- des répliques du backtest de la stratégie dont les dates de rebalancement sont décalées de quelques jours de
+  cotation et les seuils de quantile (filtres quantile des règles, comme get_percentile) tirés autour de leur valeur.
+
+Les répliques du backtest sont calculées par lots : la sélection de toutes les périodes de toutes les répliques est
+une seule sélection vectorisée (voir regles), puis les valeurs de chaque période sont obtenues par un produit
+matriciel entre la matrice de prix partagée et les poids de toutes les répliques. Les lots sont répartis sur
+plusieurs processus ; les tirages ne dépendent que de la graine, pas du nombre de processus.
+"""
+
+# Importation des packages nécessaires
+import numpy as np
+import pandas as pd
+
+from .donnees import cache_by_key, get_df_prices, get_qualitative_store, get_reference_prices, get_forex_data
+from .calculs import CURRENCIES, calculate_daily_returns, get_returns_store, get_cross_rates
+from .indicateurs import compute_indicators
+from .regles import STRATEGY_SPECS, get_spec_weights
+from .backtest import get_portfolio_values, get_calendar, get_complete_prices
+from .resultats import get_results
+from .sweep import get_process_pool
+from .profilage import profile_stage
+
+# Nombre de répliques, taille des blocs du bootstrap (environ un mois de cotation) et niveau de confiance
+N_REPLICAS = 1000
+BLOCK_SIZE = 21
+CONFIDENCE = 0.95
+
+# Décalage maximal des dates de rebalancement (en jours de cotation) et écart maximal des seuils de quantile
+MAX_SHIFT = 10
+THRESHOLD_SPREAD = 0.05
+
+# Nombre de répliques du backtest calculées ensemble par un processus
+CHUNK_REPLICAS = 250
+
+# Stratégies de l'application écrites sous forme de règles, pour la sélection vectorisée des répliques
+# (mêmes sélections que high_vol_per_strategy et momentum_strategy)
+HIGH_VOL_PER_RULES = {
+    "full_history_first": True,
+    "select": {"and": [
+        {"factor": "volatility", "quantile": 0.4},
+        {"factor": "PE_RATIO", "quantile": 0.7}
+    ]},
+    "weight": "CUR_MKT_CAP"
+}
+MOMENTUM_RULES = {"select": {"factor": "returns_sum", "top": 100}, "weight": "CUR_MKT_CAP"}
+
+
+# Fonction qui renvoie les règles de sélection d'un indice (stratégie de l'application ou indice défini par des règles)
+def get_replica_spec(indice, country=None):
+    if indice in STRATEGY_SPECS:
+        return STRATEGY_SPECS[indice]
+    if indice == "High vol PER":
+        return HIGH_VOL_PER_RULES
+    if indice == "Momentum 6 months":
+        return MOMENTUM_RULES
+    if indice == "Géographique":
+        countries = list(country) if isinstance(country, tuple) else [country]
+        return {"select": {"field": "COUNTRY", "in": countries}, "weight": "CUR_MKT_CAP"}
+
+    raise ValueError(f"Indice inconnu : {indice}")
+
+
+# Fonction qui remplace chaque seuil de quantile des règles par un seuil par ligne (réplique x période), tiré
+# uniformément à moins de "spread" du seuil d'origine pour chaque réplique et commun à toutes ses périodes
+def perturb_rule(rule, rng, n_replicas, n_periods, spread):
+    if "and" in rule or "or" in rule:
+        key = "and" if "and" in rule else "or"
+        return {key: [perturb_rule(sub_rule, rng, n_replicas, n_periods, spread) for sub_rule in rule[key]]}
+    if "not" in rule:
+        return {"not": perturb_rule(rule["not"], rng, n_replicas, n_periods, spread)}
+
+    rule = dict(rule)
+    for key in ["quantile", "quantile_below"]:
+        if key in rule:
+            thresholds = np.clip(rule[key] + rng.uniform(-spread, spread, n_replicas), 0, 1)
+            rule[key] = np.repeat(thresholds, n_periods)
+
+    return rule
+
+
+# Fonction qui décale les dates de rebalancement de chaque réplique d'un nombre aléatoire de jours de cotation et
+# renvoie les positions (répliques x périodes) des débuts et fins de détention et des bornes des périodes
+# d'observation, qui se déplacent avec la date de rebalancement. La première date de l'indice ne change pas, et le
+# décalage ne dépasse pas la moitié des périodes voisines.
+def get_perturbed_calendars(dates, calendar, n_replicas, max_shift, rng):
+    starts, ends, lookback_starts, lookback_ends = (
+        dates.get_indexer([getattr(period, field) for period in calendar])
+        for field in ["start", "end", "lookback_start", "lookback_end"]
+    )
+
+    lengths = ends - starts + 1
+    limits = np.minimum(max_shift, (np.minimum(lengths, np.r_[lengths[0], lengths[:-1]]) - 1) // 2)
+    limits[0] = 0
+    shifts = np.clip(rng.integers(-max_shift, max_shift + 1, (n_replicas, len(calendar))), -limits, limits)
+
+    replica_starts = starts + shifts
+    replica_ends = np.column_stack([replica_starts[:, 1:] - 1, np.full(n_replicas, ends[-1])])
+    replica_lookback_starts = np.clip(lookback_starts + shifts, 0, None)
+    replica_lookback_ends = np.maximum(lookback_ends + shifts, replica_lookback_starts)
+
+    return replica_starts, replica_ends, replica_lookback_starts, replica_lookback_ends
+
+
+# Fonction qui calcule les valeurs de l'indice de toutes les répliques (répliques x dates de détention) : pour chaque
+# période, un seul produit matriciel entre les prix des dates couvertes par la période dans au moins une réplique et
+# les poids de toutes les répliques, puis chaînage de chaque réplique au dernier niveau de sa période précédente
+# (comme run_backtest)
+def run_replica_backtest(prices, weights, starts, ends):
+    n_replicas, n_periods = starts.shape
+    first = starts[:, 0].min()
+    values = np.full((n_replicas, ends[:, -1].max() - first + 1), np.nan)
+    replicas = np.arange(n_replicas)
+    previous_last = None
+
+    for period in range(n_periods):
+        low, high = starts[:, period].min(), ends[:, period].max()
+        segments = get_portfolio_values(prices, weights[:, period].T, low, high).T
+
+        first_values = segments[replicas, starts[:, period] - low]
+        last_values = segments[replicas, ends[:, period] - low]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.ones(n_replicas) if previous_last is None else previous_last / first_values
+
+        positions = np.arange(low, high + 1)
+        inside = (positions >= starts[:, period, None]) & (positions <= ends[:, period, None])
+        block = values[:, low - first:high - first + 1]
+        block[inside] = (segments * scale[:, None])[inside]
+        previous_last = last_values * scale
+
+    return values
+
+
+# Fonction qui calcule les indicateurs d'un lot de répliques perturbées du backtest d'un indice
+# (exécutée par chaque processus, à partir des données partagées mises en cache)
+@profile_stage()
+def run_replica_chunk(ticker, indice, country, frequency, currency, n_replicas, max_shift, threshold_spread, seed,
+                      risk_free_rate=0.01):
+    rng = np.random.default_rng(seed)
+    df_prices = get_df_prices(ticker)
+    calendar = get_calendar(df_prices.index, indice, frequency)
+    spec = get_replica_spec(indice, country)
+
+    # Calendriers et seuils de toutes les répliques
+    starts, ends, lookback_starts, lookback_ends = get_perturbed_calendars(
+        df_prices.index, calendar, n_replicas, max_shift, rng
+    )
+    if spec.get("full_history_first"):
+        lookback_starts[:, 0] = 0
+    replica_spec = dict(spec, select=perturb_rule(spec["select"], rng, n_replicas, len(calendar), threshold_spread))
+
+    # Sélection de toutes les périodes de toutes les répliques en un seul lot, puis backtest par produits matriciels
+    weights = get_spec_weights(
+        replica_spec, get_qualitative_store(), get_returns_store(ticker),
+        df_prices.index[lookback_starts.ravel()], df_prices.index[lookback_ends.ravel()]
+    )
+    values = run_replica_backtest(df_prices.to_numpy(), weights.reshape(n_replicas, len(calendar), -1), starts, ends)
+
+    # Conversion dans la devise choisie et indicateurs sur les dates communes avec la référence (comme les pages)
+    dates = df_prices.index[starts[:, 0].min():ends[:, -1].max() + 1]
+    rates = get_cross_rates(get_forex_data(), dates)[:, CURRENCIES.index("USD"), CURRENCIES.index(currency)]
+    df_replicas = pd.DataFrame(values.T * rates[:, None], index=dates)
+    df_reference = get_reference_prices(ticker).iloc[:, 0]
+    df_replicas = df_replicas.loc[df_replicas.index.isin(df_reference.index)]
+
+    return compute_indicators(df_replicas, df_reference, risk_free_rate)
+
+
+# Fonction qui calcule les indicateurs de n_replicas répliques perturbées du backtest d'un indice (dates de
+# rebalancement et seuils de quantile), par lots répartis sur plusieurs processus
+def run_perturbation_replicas(ticker, indice, country=None, frequency=None, currency="USD", n_replicas=N_REPLICAS,
+                              max_shift=MAX_SHIFT, threshold_spread=THRESHOLD_SPREAD, seed=0, workers=None,
+                              risk_free_rate=0.01):
+    sizes = [min(CHUNK_REPLICAS, n_replicas - start) for start in range(0, n_replicas, CHUNK_REPLICAS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (ticker, indice, country, frequency, currency, size, max_shift, threshold_spread, chunk_seed, risk_free_rate)
+        for size, chunk_seed in zip(sizes, seeds)
+    ]
+
+    if workers == 1 or len(tasks) == 1:
+        df_chunks = [run_replica_chunk(*task) for task in tasks]
+    else:
+        # Données chargées avant la création des processus, qui en héritent (fork) comme pour le sweep
+        get_df_prices(ticker)
+        get_returns_store(ticker)
+        get_qualitative_store()
+        get_forex_data()
+        get_reference_prices(ticker)
+
+        with get_process_pool(workers) as executor:
+            df_chunks = list(executor.map(run_replica_chunk, *zip(*tasks)))
+
+    return pd.concat(df_chunks, ignore_index=True).rename_axis("Réplique")
+
+
+# Fonction qui tire les positions des rendements de chaque réplique du bootstrap par blocs (répliques x dates) :
+# blocs de block_size rendements consécutifs commençant à des positions aléatoires, mis bout à bout
+def get_block_bootstrap_positions(n_returns, n_replicas, block_size, rng):
+    block_size = min(block_size, n_returns)
+    n_blocks = -(-n_returns // block_size)
+    block_starts = rng.integers(0, n_returns - block_size + 1, (n_replicas, n_blocks))
+    positions = (block_starts[:, :, None] + np.arange(block_size)).reshape(n_replicas, -1)
+
+    return positions[:, :n_returns]
+
+
+# Fonction qui calcule les indicateurs de n_replicas séries de l'indice et de sa référence reconstruites à partir de
+# leurs rendements quotidiens rééchantillonnés par blocs
+@profile_stage()
+def run_block_bootstrap(df_indice, df_reference, n_replicas=N_REPLICAS, block_size=BLOCK_SIZE, seed=0,
+                        risk_free_rate=0.01):
+    rng = np.random.default_rng(seed)
+    df_prices = pd.concat([df_indice, df_reference], axis=1).dropna()
+    returns = calculate_daily_returns(df_prices).to_numpy(dtype=float)[1:]
+    if len(returns) < 2:
+        raise ValueError(
+            f"Le bootstrap par blocs demande au moins deux rendements de l'indice et de sa référence ({len(returns)} "
+            f"disponible(s)) : vérifier que la sélection de l'indice n'est pas vide"
+        )
+
+    # Séries de prix de chaque réplique (dates x répliques), partant de 100
+    positions = get_block_bootstrap_positions(len(returns), n_replicas, block_size, rng)
+    paths = 100 * np.cumprod(1 + returns[positions], axis=1)
+    paths = np.concatenate([np.full((n_replicas, 1, 2), 100.0), paths], axis=1)
+
+    df_paths = pd.DataFrame(paths[:, :, 0].T, index=df_prices.index)
+    df_references = pd.DataFrame(paths[:, :, 1].T, index=df_prices.index)
+
+    return compute_indicators(df_paths, df_references, risk_free_rate).reset_index(drop=True).rename_axis("Réplique")
+
+
+# Fonction qui résume les indicateurs des répliques : médiane et bornes de l'intervalle de confiance (percentiles)
+def get_confidence_intervals(df_replicas, confidence=CONFIDENCE):
+    tail = (1 - confidence) / 2
+
+    return pd.DataFrame({
+        "Médiane": df_replicas.median(),
+        "Borne basse": df_replicas.quantile(tail),
+        "Borne haute": df_replicas.quantile(1 - tail)
+    })
+
+
+# Fonction qui calcule les intervalles de confiance des indicateurs d'un indice dans une devise par les deux méthodes
+# (les répliques du backtest, réparties par défaut sur tous les coeurs, ne sont calculées que pour la pondération par
+# la capitalisation boursière)
+@profile_stage()
+@cache_by_key()
+def get_robustness(ticker, indice, country=None, frequency=None, weighting=None, currency="USD",
+                   n_replicas=N_REPLICAS, workers=None):
+    results = get_results(ticker, indice, country, frequency, weighting)
+    df_complete_prices = get_complete_prices(results.index[currency], get_reference_prices(ticker))
+
+    df_bootstrap = run_block_bootstrap(df_complete_prices.iloc[:, 0], df_complete_prices.iloc[:, 1], n_replicas)
+    intervals = {"Bootstrap par blocs": get_confidence_intervals(df_bootstrap)}
+    if weighting is None:
+        df_perturbations = run_perturbation_replicas(
+            ticker, indice, country, frequency, currency, n_replicas, workers=workers
+        )
+        intervals["Perturbations du backtest"] = get_confidence_intervals(df_perturbations)
+
+    return pd.concat(intervals, axis=1)
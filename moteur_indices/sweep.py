@@ -0,0 +1,115 @@
+"""
+Ce fichier permet de calculer en une seule fois toutes les combinaisons de paramètres de l'application
+(univers d'investissement x indice x pays x devise), sans lancer streamlit, pour le rapport mensuel.
+
+Les calculs sont répartis sur plusieurs processus. Les données sont chargées une seule fois par le processus
+principal avant la création des processus de calcul, qui en héritent (fork) ou les relisent depuis le cache Parquet.
+Les processus de calcul reçoivent le classeur (option --workbook) et les stratégies définies par des règles du
+processus principal, qu'un processus créé sans fork (spawn, sous Windows et macOS) ne retrouverait pas.
+
+Utilisation : python -m moteur_indices sweep --out resultats --workers 8
+"""
+
+# Importation des packages nécessaires
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from . import donnees
+from .donnees import (
+    get_df_prices, get_df_qualitative, get_qualitative_store, get_qualitative_years, get_reference_prices,
+    get_forex_data
+)
+from .calculs import CURRENCIES, get_returns_store
+from .regles import STRATEGY_SPECS
+from .backtest import START_YEAR, UNIVERSES, get_indices, get_complete_prices
+from .resultats import get_results
+
+
+# Fonction qui prépare un processus de calcul avec le classeur et les stratégies définies par des règles du processus
+# principal (un processus créé par spawn réimporte les modules avec le classeur par défaut et sans ces stratégies)
+def init_worker(excel_file, strategy_specs):
+    donnees.EXCEL_FILE = excel_file
+    STRATEGY_SPECS.update(strategy_specs)
+
+
+# Fonction qui crée le pool de processus de calcul : avec fork, les processus partagent les données déjà chargées
+# sans les copier
+def get_process_pool(workers=None):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=init_worker,
+        initargs=(donnees.EXCEL_FILE, dict(STRATEGY_SPECS))
+    )
+
+
+# Fonction qui liste les combinaisons univers x indice x pays à calculer (les devises sont traitées ensemble)
+def get_sweep_tasks():
+    tasks = []
+    for ticker in UNIVERSES:
+        for indice in get_indices():
+            if indice == "Géographique":
+                # Seuls les pays représentés dans l'univers donnent un indice
+                countries = get_df_qualitative(ticker, START_YEAR - 1)["COUNTRY"].dropna().unique()
+                tasks.extend((ticker, indice, country) for country in sorted(countries))
+            else:
+                tasks.append((ticker, indice, None))
+
+    return tasks
+
+
+# Fonction qui charge les données partagées par tous les calculs (avant la création des processus)
+def load_shared_data():
+    get_forex_data()
+    get_qualitative_store()
+    for ticker in UNIVERSES:
+        get_df_prices(ticker)
+        get_returns_store(ticker)
+        get_reference_prices(ticker)
+        for year in get_qualitative_years():
+            get_df_qualitative(ticker, year)
+
+
+# Fonction qui calcule un indice dans toutes les devises, écrit ses séries sur disque et renvoie ses indicateurs
+# (les résultats sont aussi enregistrés dans le stockage lu par les pages de l'application)
+def run_sweep_task(task, out_dir):
+    ticker, indice, country = task
+    results = get_results(ticker, indice, country)
+    df_reference_prices = get_reference_prices(ticker)
+
+    name = "_".join(str(part).replace(" ", "-") for part in task if part is not None)
+
+    df_series = {}
+    for currency in CURRENCIES:
+        df_complete_prices = get_complete_prices(results.index[currency], df_reference_prices)
+        df_series[currency] = df_complete_prices.iloc[:, 0]
+
+    pd.DataFrame(df_series).to_parquet(os.path.join(out_dir, f"indice_{name}.parquet"))
+    results.weights.to_parquet(os.path.join(out_dir, f"poids_{name}.parquet"))
+
+    df_indicators = results.indicators.rename_axis("Devise").reset_index()
+    df_indicators.insert(0, "Pays", country)
+    df_indicators.insert(0, "Indice", indice)
+    df_indicators.insert(0, "Univers", ticker)
+
+    return df_indicators.to_dict("records")
+
+
+# Fonction qui calcule toutes les combinaisons sur un pool de processus
+def run_sweep(out_dir, workers=None):
+    os.makedirs(out_dir, exist_ok=True)
+    load_shared_data()
+    tasks = get_sweep_tasks()
+
+    with get_process_pool(workers) as executor:
+        results = executor.map(run_sweep_task, tasks, [out_dir] * len(tasks))
+        df_indicators = pd.DataFrame([row for rows in results for row in rows])
+
+    df_indicators.to_csv(os.path.join(out_dir, "indicateurs.csv"), index=False)
+
+    return df_indicators
+
@@ -1,5 +1,5 @@
 import streamlit as st
-import pandas as pd
+import fonctiuns_project as f
 
 # Fonction pour sauvegarder les paramètres dans la session
 def save_parameters():
@@ -7,6 +7,10 @@ def save_parameters():
     st.session_state['stock_index'] = st.session_state.get('stock_index_input')
     st.session_state['indice'] = st.session_state.get('indice_input')
     st.session_state['country'] = st.session_state.get('country_input') if st.session_state.get('indice_input') == 'Géographique' else None
+    st.session_state['rebalancing'] = st.session_state.get('rebalancing_input')
+    st.session_state['weighting'] = st.session_state.get('weighting_input')
+    st.session_state['cost_model'] = st.session_state.get('cost_model_input')
+    st.session_state['cost'] = st.session_state.get('cost_input')
 
 # Initialisation des valeurs par défaut dans la session
 if 'currency' not in st.session_state:
@@ -17,6 +21,14 @@ if 'indice' not in st.session_state:
     st.session_state.indice = 'High vol PER'
 if 'country' not in st.session_state:
     st.session_state.country = None
+if 'rebalancing' not in st.session_state:
+    st.session_state.rebalancing = 'Par défaut'
+if 'weighting' not in st.session_state:
+    st.session_state.weighting = 'Capitalisation boursière'
+if 'cost_model' not in st.session_state:
+    st.session_state.cost_model = 'Commission (pb par sens)'
+if 'cost' not in st.session_state:
+    st.session_state.cost = 0.0
 
 st.title('Sélection des Paramètres')
 
@@ -36,19 +48,19 @@ st.selectbox(
 )
 
 # Widget pour sélectionner l'indice, déclenchant une mise à jour instantanée
+indices_list = f.get_indices()
 indice = st.radio(
     'Choisissez l\'indice que vous souhaitez afficher:',
-    ['High vol PER', 'Momentum 6 months', 'Géographique'],
+    indices_list,
     key='indice_input',
-    index=['High vol PER', 'Momentum 6 months', 'Géographique'].index(st.session_state.indice)
+    index=indices_list.index(st.session_state.indice) if st.session_state.indice in indices_list else 0
 )
 
 # Si "Géographique" est sélectionné, afficher la liste des pays
 if indice == 'Géographique':
     try:
-        # Charger la liste des pays depuis le fichier Excel
-        countries_list = pd.read_excel("Data_projets_M1EEF - fige.xlsx", sheet_name="Qualitativ_2018")["COUNTRY"].unique().tolist()
-        countries_list.sort()
+        # Charger la liste des pays depuis le cache des données qualitatives
+        countries_list = f.get_countries(2018)
 
         # Widget pour choisir un pays
         st.selectbox(
@@ -60,7 +72,43 @@ if indice == 'Géographique':
     except Exception as e:
         st.error(f"Erreur lors du chargement de la liste des pays : {e}")
 
+# Widget pour choisir la fréquence de rebalancement de l'indice
+st.selectbox(
+    'Choisissez la fréquence de rebalancement:',
+    ['Par défaut', 'Annuelle', 'Semestrielle', 'Trimestrielle', 'Mensuelle'],
+    key='rebalancing_input',
+    index=['Par défaut', 'Annuelle', 'Semestrielle', 'Trimestrielle', 'Mensuelle'].index(st.session_state.rebalancing)
+)
+
+# Widget pour choisir la pondération des titres sélectionnés
+st.selectbox(
+    'Choisissez la pondération des titres:',
+    list(f.WEIGHTING_LABELS),
+    key='weighting_input',
+    index=list(f.WEIGHTING_LABELS).index(st.session_state.weighting)
+)
+
+# Widgets pour les coûts de transaction payés à chaque rebalancement (0 : indice brut seulement)
+st.selectbox(
+    'Choisissez le modèle de coûts de transaction:',
+    list(f.COST_MODEL_LABELS),
+    key='cost_model_input',
+    index=list(f.COST_MODEL_LABELS).index(st.session_state.cost_model)
+)
+
+st.number_input(
+    'Coûts de transaction (points de base):',
+    min_value=0.0,
+    max_value=500.0,
+    step=5.0,
+    key='cost_input',
+    value=st.session_state.cost
+)
+
 # Bouton de validation
 if st.button('Valider les paramètres'):
     save_parameters()
     st.success('Paramètres sauvegardés! Vous pouvez maintenant aller à la page de visualisation.')
+
+# Panneau de profilage des étapes (affiché seulement si le profilage est activé)
+f.show_profiling_panel()
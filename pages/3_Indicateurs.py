@@ -1,75 +1,25 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import statsmodels.api as sm
+import fonctiuns_project as f
 import plotly.graph_objects as go
 
-def calculer_indicateurs(df_indice: pd.Series, df_reference: pd.Series, risk_free_rate=0.01):
-    """
-    Calcule les indicateurs de performance et de risque pour l'indice sélectionné.
-    """
-    # Convertir les séries en DataFrame
-    df_indice = df_indice.to_frame()
-    df_reference = df_reference.to_frame()
-    
-    # Performance totale
-    performance_totale = ((df_indice.iloc[-1, 0] - df_indice.iloc[0, 0]) / df_indice.iloc[0, 0]) * 100
-
-    # Rendements mensuels
-    rend_indice = df_indice.pct_change()
-    rend_reference = df_reference.pct_change()
-    
-    # Performance annualisée
-    perf_annuelle = ((1 + rend_indice.mean().iloc[0])**252 - 1) * 100
-    
-    # Max drawdown
-    cumulative_max = df_indice.cummax()
-    drawdowns = (df_indice - cumulative_max) / cumulative_max
-    max_drawdown = (drawdowns.min().iloc[0] * 100).round(2)
-    
-    # Volatilité annualisée
-    volatilite_annuelle = ((rend_indice.std().iloc[0] * np.sqrt(252)) * 100).round(2)
-    
-    # Ratio de Sharpe
-    sharpe_ratio = ((perf_annuelle - risk_free_rate) / volatilite_annuelle).round(2)
-    
-    # Beta et Alpha
-    rend_indice_clean = rend_indice.dropna()
-    rend_reference_clean = rend_reference.dropna()
-    
-    # S'assurer que les deux séries ont la même longueur
-    common_index = rend_indice_clean.index.intersection(rend_reference_clean.index)
-    rend_indice_clean = rend_indice_clean.loc[common_index]
-    rend_reference_clean = rend_reference_clean.loc[common_index]
-    
-    X = sm.add_constant(rend_reference_clean)
-    model = sm.OLS(rend_indice_clean, X).fit()
-    beta = model.params[1].round(2)
-    alpha = (model.params[0] * 252).round(4)  # Annualisé
-
-    return {
-        "Performance Totale": f"{performance_totale.round(2)}%",
-        "Performance Annualisée": f"{perf_annuelle.round(2)}%",
-        "Max Drawdown": f"{max_drawdown}%",
-        "Volatilité Annualisée": f"{volatilite_annuelle}%",
-        "Ratio de Sharpe": sharpe_ratio,
-        "Beta": beta,
-        "Alpha": alpha
-    }
-
 st.title('Indicateurs de Performance')
 
-# Vérifier si les données nécessaires sont disponibles
-required_data = ['currency', 'stock_index', 'indice', 'df_indice', 'df_reference']
+# Vérifier si les paramètres ont été sélectionnés
+required_data = ['currency', 'stock_index', 'indice']
 if not all(param in st.session_state for param in required_data):
-    st.error('Veuillez d\'abord visualiser les résultats dans la page de visualisation.')
+    st.error('Veuillez d\'abord sélectionner les paramètres dans la page de sélection.')
     st.stop()
 
 try:
-    # Récupérer les paramètres et les données
+    # Récupérer les paramètres
+    currency = st.session_state['currency']
     indice = st.session_state['indice']
     stock_index = st.session_state['stock_index']
     country = st.session_state.get('country')
+    rebalancing = st.session_state.get('rebalancing', 'Par défaut')
+    weighting = st.session_state.get('weighting', 'Capitalisation boursière')
+    ticker = "SPX" if stock_index == "S&P500" else "SXXP"
     
     # Titre dynamique selon l'indice
     if indice == "Géographique":
@@ -77,11 +27,11 @@ try:
     else:
         titre_indice = f"l'indice {indice}"
     
-    # Calculer les indicateurs
-    indicateurs_dict = calculer_indicateurs(
-        st.session_state['df_indice'],
-        st.session_state['df_reference']
+    # Indicateurs enregistrés avec les résultats de l'indice (calculés s'ils n'existent pas encore)
+    results = f.get_results(
+        ticker, indice, country, f.REBALANCING_LABELS[rebalancing], f.WEIGHTING_LABELS[weighting]
     )
+    indicateurs_dict = f.format_indicators(results.indicators).loc[currency].to_dict()
     
     fig = go.Figure(data=[go.Table(
         header=dict(
@@ -108,7 +58,7 @@ try:
     )
 
     # Afficher le tableau dans Streamlit
-    st.plotly_chart(fig)
+    f.show_chart(fig)
 
     
     # Ajouter des explications sur les indicateurs
@@ -123,6 +73,49 @@ try:
         - **Alpha**: Surperformance de l'indice par rapport au marché de référence (annualisé)
         """)
 
+    # Indicateurs glissants de l'indice et de sa référence dans la devise choisie
+    st.subheader('Analyse glissante')
+    df_complete_prices = f.get_complete_prices(results.index[currency], f.get_reference_prices(ticker))
+    df_indice = df_complete_prices.iloc[:, 0]
+    df_reference = df_complete_prices.iloc[:, 1]
+
+    rolling_indicators = {
+        window: f.compute_rolling_indicators(df_indice, df_reference, window) for window in f.ROLLING_WINDOWS
+    }
+
+    # Un graphique par indicateur, avec une courbe par fenêtre
+    for name in ["Volatilité Annualisée", "Ratio de Sharpe", "Beta"]:
+        df_rolling = pd.DataFrame({
+            f"{window} jours": rolling_indicators[window][name] for window in f.ROLLING_WINDOWS
+        }).dropna(how='all')
+        f.show_chart(f.plot_series(df_rolling, f"{name} glissant(e) de {titre_indice} face au {stock_index}"))
+
+    df_drawdown = f.compute_drawdown(df_indice).to_frame('Drawdown (%)')
+    f.show_chart(f.plot_series(df_drawdown, f"Drawdown courant de {titre_indice}"))
+
+    # Intervalles de confiance des indicateurs, calculés à la demande (plusieurs secondes pour 10 000 répliques)
+    st.subheader('Robustesse des indicateurs')
+    n_replicas = st.selectbox('Nombre de répliques', [1000, 5000, 10000])
+    if st.button('Calculer les intervalles de confiance'):
+        with st.spinner('Calcul des répliques...'):
+            df_intervals = f.get_robustness(
+                ticker, indice, country, f.REBALANCING_LABELS[rebalancing], f.WEIGHTING_LABELS[weighting],
+                currency, n_replicas
+            )
+        for method in df_intervals.columns.get_level_values(0).unique():
+            st.markdown(f"**{method}**")
+            st.dataframe(df_intervals[method].round(4))
+        st.caption(
+            f"Médiane et intervalle de confiance à {f.CONFIDENCE:.0%} de chaque indicateur. Le bootstrap par blocs "
+            f"rééchantillonne les rendements journaliers de l'indice et de sa référence par blocs de {f.BLOCK_SIZE} "
+            f"jours ; les répliques perturbées du backtest décalent les dates de rebalancement (jusqu'à "
+            f"{f.MAX_SHIFT} jours) et les seuils de quantile des sélections. Les répliques du backtest ne sont "
+            f"calculées que pour la pondération par la capitalisation boursière."
+        )
+
 except Exception as e:
     st.error(f"Une erreur s'est produite lors du calcul des indicateurs: {str(e)}")
-    st.write("Veuillez vérifier les données d'entrée et réessayer.")
\ No newline at end of file
+    st.write("Veuillez vérifier les données d'entrée et réessayer.")
+
+# Panneau de profilage des étapes (affiché seulement si le profilage est activé)
+f.show_profiling_panel()
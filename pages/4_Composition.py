@@ -1,23 +1,26 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
+import fonctiuns_project as f
 
-def composition_index(df_weights):
+def composition_index(df_attribution, period):
     """
-    Extraire la liste des titres composant l'indice, et leurs poids
+    Extraire les titres composant l'indice sur une période, avec leurs poids réels et leur contribution
     """
-    composition = df_weights.index.tolist()
+    composition = df_attribution.loc[period].sort_values("Poids au rebalancement", ascending=False)
     
     return composition
 
+@f.profile_stage()
 def create_composition_table(composition, title):
     """
-    Crée un tableau Plotly affichant les titres et leurs poids dans l'indice.
+    Crée un tableau Plotly affichant les titres, leurs poids dans l'indice et leur contribution à sa performance.
     """
-    # Créer le tableau Plotly à partir de la liste des titres
+    # Créer le tableau Plotly à partir des titres et de leurs poids (en %)
     table_composition = go.Figure(data=[go.Table(
-        header=dict(values=["Titres"]),
-        cells=dict(values=[composition])  # Utilisation de "composition" ici pour les valeurs des cellules
+        header=dict(values=["Titres"] + [f"{column} (%)" for column in composition.columns]),
+        cells=dict(values=[composition.index.tolist()] + [
+            (composition[column] * 100).round(2).tolist() for column in composition.columns
+        ])
     )])
     
     # Ajouter un titre au tableau
@@ -31,31 +34,73 @@ def create_composition_table(composition, title):
     
     return table_composition
 
+@f.profile_stage()
+def create_composition_treemap(composition, title):
+    """
+    Crée un treemap Plotly des titres de l'indice, la surface étant le poids réel en fin de période.
+    """
+    treemap_composition = go.Figure(go.Treemap(
+        labels=composition.index.tolist(),
+        parents=[""] * len(composition),
+        values=composition["Poids en fin de période"].tolist(),
+        customdata=composition["Contribution"] * 100,
+        hovertemplate="%{label}<br>Poids : %{value:.2%}<br>Contribution : %{customdata:.2f}%<extra></extra>"
+    ))
+
+    treemap_composition.update_layout(title=title, margin=dict(l=20, r=20, t=50, b=20))
+
+    return treemap_composition
+
 
 # Titre de la page
 st.title('Composition de l\'Indice')
 
-# Vérifier si les données nécessaires sont disponibles
-if 'df_weights' not in st.session_state:
-    st.error('Veuillez d\'abord visualiser les résultats dans la page de visualisation ou calculer les poids de l\'indice.')
+# Vérifier si les paramètres ont été sélectionnés
+if not all(param in st.session_state for param in ['stock_index', 'indice']):
+    st.error('Veuillez d\'abord sélectionner les paramètres dans la page de sélection.')
     st.stop()
 
 try:
-    # Récupérer les données des poids de l'indice
-    df_weights = st.session_state['df_weights']
+    # Récupérer les paramètres
+    stock_index = st.session_state['stock_index']
+    indice = st.session_state['indice']
+    country = st.session_state.get('country')
+    frequency = f.REBALANCING_LABELS[st.session_state.get('rebalancing', 'Par défaut')]
+    weighting = f.WEIGHTING_LABELS[st.session_state.get('weighting', 'Capitalisation boursière')]
+    ticker = "SPX" if stock_index == "S&P500" else "SXXP"
 
-    # Extraire la composition de l'indice (titres et poids)
-    composition = df_weights.index.tolist()
+    # Attribution par titre de chaque période de rebalancement
+    calendar = f.get_results_calendar(ticker, indice, country, frequency, weighting)
+    index_attribution = f.get_index_attribution(ticker, indice, country, frequency, weighting)
+    df_attribution = f.summarize_attribution(index_attribution, calendar)
+
+    # Choix de la période (la dernière par défaut)
+    periods = {f"{period.start:%d/%m/%Y} - {period.end:%d/%m/%Y}": period for period in calendar}
+    label = st.selectbox('Période de rebalancement', list(periods), index=len(periods) - 1)
+    period = periods[label]
+
+    # Extraire la composition de l'indice (titres, poids et contributions)
+    composition = composition_index(df_attribution, period.start)
 
     # Titre dynamique pour la composition de l'indice
-    titre_composition = f"Composition de l'indice {st.session_state.get('indice')}"
+    titre_composition = f"Composition de l'indice {indice} ({label})"
 
-    # Créer le tableau de la composition de l'indice
+    # Créer le tableau et le treemap de la composition de l'indice
     composition_table = create_composition_table(composition, titre_composition)
+    composition_treemap = create_composition_treemap(composition, "Poids réels en fin de période")
 
-    # Afficher le tableau dans Streamlit
-    st.plotly_chart(composition_table)
+    # Afficher le tableau et le treemap dans Streamlit
+    f.show_chart(composition_table)
+    f.show_chart(composition_treemap)
+
+    # Contribution cumulée (en %) des 10 principaux titres au rendement de l'indice sur la période
+    top_titles = composition.index[:10]
+    df_contributions = index_attribution.cumulative_contributions.loc[period.start:period.end, top_titles] * 100
+    f.show_chart(f.plot_series(df_contributions, "Contribution cumulée des 10 principaux titres (%)"))
     
 except Exception as e:
     st.error(f"Une erreur s'est produite lors de l'affichage de la composition de l'indice: {str(e)}")
     st.write("Veuillez vérifier les données d'entrée et réessayer.")
+
+# Panneau de profilage des étapes (affiché seulement si le profilage est activé)
+f.show_profiling_panel()
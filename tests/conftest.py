@@ -0,0 +1,46 @@
+"""
+Configuration commune des tests : accès au package moteur_indices et au générateur de données synthétiques des
+benchmarks, classeur synthétique partagé par les tests qui lisent les données.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+from synthetique import make_synthetic_workbook, clear_caches
+
+# Taille du classeur synthétique des tests (titres, années de prix)
+N_TICKERS = 150
+N_YEARS = 7
+
+
+# Classeur synthétique créé une seule fois dans un répertoire temporaire, qui devient le répertoire courant
+@pytest.fixture(scope="session")
+def synthetic_workbook(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("classeur")
+    initial_dir = os.getcwd()
+    os.chdir(workdir)
+    make_synthetic_workbook(N_TICKERS, N_YEARS, seed=0)
+    clear_caches()
+
+    yield workdir
+
+    clear_caches()
+    os.chdir(initial_dir)
+
+
+# Répertoire temporaire de travail, caches vidés à l'entrée et à la sortie (les caches en mémoire ne distinguent pas
+# les données et les résultats de deux classeurs)
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clear_caches()
+
+    yield tmp_path
+
+    clear_caches()
@@ -0,0 +1,266 @@
+"""
+Tests de non-régression du moteur de backtest
+
+Chaque test compare une version optimisée à la version qu'elle remplace : index_tracking et la boucle par date,
+run_backtest et le chaînage des indices période par période, la mise à jour incrémentale et le recalcul complet, les
+stratégies écrites sous forme de règles et les stratégies écrites en python.
+"""
+
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import moteur_indices as mi
+from moteur_indices import donnees
+
+# Dates de coupure de la mise à jour incrémentale : au milieu d'une période, en fin d'année et en fin de trimestre
+CUT_DATES = ["2020-06-15", "2020-12-31", "2021-03-31"]
+
+
+# Fonction qui crée un panel de prix aléatoire (marche aléatoire) avec des prix manquants, y compris des titres
+# cotés après la première date
+def make_prices(seed, n_tickers=40, start="2017-01-02", end="2021-12-31", missing=0.05):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), n_tickers)), axis=0))
+    prices[rng.random(prices.shape) < missing] = np.nan
+    for column in rng.choice(n_tickers, 3, replace=False):
+        prices[:rng.integers(1, len(dates) // 2), column] = np.nan
+
+    return pd.DataFrame(prices, index=dates, columns=[f"T{i} Equity" for i in range(n_tickers)])
+
+
+# Fonction qui crée des poids aléatoires mal alignés sur les prix : ordre différent, titres absents du panel,
+# titres du panel sans poids et poids manquants
+def make_weights(df_prices, seed):
+    rng = np.random.default_rng(seed)
+    tickers = list(rng.choice(df_prices.columns, len(df_prices.columns) // 2, replace=False)) + ["ABSENT Equity"]
+    weights = rng.uniform(0, 1, len(tickers))
+    weights[rng.random(len(tickers)) < 0.2] = np.nan
+
+    return pd.Series(weights, index=tickers)
+
+
+# Ancienne version d'index_tracking : somme des prix pondérés date par date
+def index_tracking_loop(df_prices, df_weights):
+    return pd.Series([(df_weights * df_prices.loc[date]).sum() for date in df_prices.index], index=df_prices.index)
+
+
+# Stratégie de test : les 10 titres les plus performants sur la période d'observation, poids aléatoires
+def top_returns_strategy(df_prices, period):
+    df_lookback = df_prices.loc[period.lookback_start:period.lookback_end]
+    df_returns = (df_lookback.ffill().iloc[-1] / df_lookback.bfill().iloc[0]).dropna()
+    tickers = df_returns.nlargest(10).index
+    weights = np.random.default_rng(period.start.toordinal()).uniform(0.5, 1.5, len(tickers))
+
+    return pd.Series(weights / weights.sum(), index=tickers)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_index_tracking_matches_loop(seed, dtype):
+    df_prices = make_prices(seed).astype(dtype)
+    df_weights = make_weights(df_prices, seed)
+
+    expected = index_tracking_loop(df_prices.astype(float), df_weights)
+    rtol = 1e-12 if dtype == np.float64 else 1e-5
+    np.testing.assert_allclose(mi.index_tracking(df_prices, df_weights), expected, rtol=rtol)
+
+
+# Date sans aucun prix et poids tous manquants : valeur nulle, comme la somme de la boucle
+def test_index_tracking_missing_values():
+    df_prices = make_prices(0)
+    df_prices.iloc[10] = np.nan
+    df_weights = pd.Series(np.nan, index=df_prices.columns[:5])
+
+    np.testing.assert_allclose(mi.index_tracking(df_prices, make_weights(df_prices, 0)).iloc[10], 0.0)
+    np.testing.assert_allclose(mi.index_tracking(df_prices, df_weights), 0.0)
+
+
+@pytest.mark.parametrize("frequency", ["annual", "semi-annual", "quarterly", "monthly"])
+def test_run_backtest_matches_chained_periods(frequency):
+    df_prices = make_prices(1).ffill()
+    calendar = mi.rebalance_calendar(df_prices.index, frequency, start=2019)
+
+    # Ancienne construction : indice de chaque période chaîné au dernier niveau de la période précédente
+    segments = []
+    for period in calendar:
+        df_values = mi.index_tracking(df_prices.loc[period.start:period.end], top_returns_strategy(df_prices, period))
+        segments.append(df_values if not segments else mi.continuity_index(df_values, segments[-1]))
+    expected = pd.concat(segments)
+
+    df_index_values, df_weights_periods = mi.run_backtest(df_prices, calendar, top_returns_strategy)
+
+    pd.testing.assert_index_equal(df_index_values.index, expected.index)
+    np.testing.assert_allclose(df_index_values, expected, rtol=1e-12)
+    assert list(df_weights_periods.index) == [period.start for period in calendar]
+
+
+@pytest.mark.parametrize("frequency", ["annual", "quarterly", "monthly"])
+@pytest.mark.parametrize("cut", CUT_DATES)
+def test_update_backtest_matches_full_recompute(frequency, cut):
+    df_raw_prices = make_prices(2)
+    df_prices = df_raw_prices.ffill()
+    calendar = mi.rebalance_calendar(df_prices.index, frequency, start=2019)
+    expected_values, expected_weights = mi.run_backtest(df_prices, calendar, top_returns_strategy)
+
+    # Indice calculé jusqu'à la date de coupure puis mis à jour en deux fois avec les nouveaux prix
+    df_cut_prices = df_prices.loc[:cut]
+    df_index_values, df_weights_periods = mi.run_backtest(
+        df_cut_prices, mi.rebalance_calendar(df_cut_prices.index, frequency, start=2019), top_returns_strategy
+    )
+    df_new_prices = df_raw_prices.loc[df_raw_prices.index > cut]
+    for df_batch in [df_new_prices.iloc[:3], df_new_prices.iloc[3:]]:
+        df_cut_prices = mi.append_prices(df_cut_prices, df_batch)
+        df_index_values, df_weights_periods = mi.update_backtest(
+            df_index_values, df_weights_periods, df_cut_prices,
+            mi.rebalance_calendar(df_cut_prices.index, frequency, start=2019), top_returns_strategy
+        )
+
+    pd.testing.assert_index_equal(df_index_values.index, expected_values.index)
+    np.testing.assert_allclose(df_index_values, expected_values, rtol=1e-9)
+    np.testing.assert_allclose(df_weights_periods, expected_weights, rtol=1e-12)
+
+
+# Prix sans la dernière date de l'indice : le rendement du premier nouveau jour ne peut pas être calculé
+def test_update_backtest_requires_last_date():
+    df_prices = make_prices(2).ffill()
+    df_index_values, df_weights_periods = mi.run_backtest(
+        df_prices.loc[:"2020-06-15"], mi.rebalance_calendar(df_prices.loc[:"2020-06-15"].index, start=2019),
+        top_returns_strategy
+    )
+    df_new_prices = df_prices.loc["2020-06-16":"2020-06-30"]
+
+    with pytest.raises(ValueError):
+        mi.update_backtest(
+            df_index_values, df_weights_periods, df_new_prices, mi.rebalance_calendar(df_prices.index, start=2019),
+            top_returns_strategy
+        )
+
+
+# Période sans titre : ses poids sont nuls, la sortie complète et la nouvelle entrée du rebalancement suivant comptent
+def test_get_trades_empty_period():
+    df_prices = make_prices(3).ffill().bfill()
+    calendar = mi.rebalance_calendar(df_prices.index, "annual", start=2019)
+    df_weights_periods = pd.DataFrame(
+        np.random.default_rng(3).uniform(0, 1, (len(calendar), df_prices.shape[1])),
+        index=[period.start for period in calendar], columns=df_prices.columns
+    )
+    df_weights_periods.iloc[1] = 0.0
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        df_trades = mi.get_trades(df_prices, df_weights_periods, calendar)
+
+    # Valeur des positions en début et en fin de période, rapportée à la valeur du portefeuille
+    def real_weights(position, date):
+        holdings = df_weights_periods.iloc[position] * df_prices.loc[date]
+        return holdings / holdings.sum()
+
+    assert not df_trades.isna().any().any()
+    np.testing.assert_allclose(df_trades.iloc[1], -real_weights(0, calendar[0].end), atol=1e-15)
+    np.testing.assert_allclose(df_trades.iloc[2], real_weights(2, calendar[2].start), atol=1e-15)
+    np.testing.assert_allclose(df_trades.abs().sum(axis=1).iloc[1:3], 1.0)
+
+
+# Fonction qui crée, dans le répertoire courant, une copie du classeur synthétique dont les prix s'arrêtent à "cut"
+def make_truncated_workbook(source_cache, ticker, cut):
+    open(donnees.EXCEL_FILE, "w").close()
+    cache_path = os.path.join(donnees.CACHE_DIR, donnees.get_workbook_key())
+    os.makedirs(cache_path)
+
+    for name in os.listdir(source_cache):
+        if name.endswith(".parquet") and not name.startswith(ticker + "_PX_LAST"):
+            shutil.copy(os.path.join(source_cache, name), cache_path)
+    df_raw_prices = pd.read_parquet(os.path.join(source_cache, ticker + "_PX_LAST.parquet"))
+    df_raw_prices[df_raw_prices["Dates"] <= cut].to_parquet(
+        os.path.join(cache_path, ticker + "_PX_LAST.parquet"), index=False
+    )
+    open(os.path.join(cache_path, ".complete"), "w").close()
+
+    # Nouveaux prix de fin de journée : toutes les dates postérieures à la coupure
+    return df_raw_prices[df_raw_prices["Dates"] > cut].drop(columns=df_raw_prices.columns[0]).set_index("Dates")
+
+
+@pytest.mark.parametrize("indice, country, frequency, weighting", [
+    ("High vol PER", None, None, None),
+    ("Momentum 6 months", None, "quarterly", None),
+    ("Géographique", "FRANCE", "monthly", "equal"),
+])
+@pytest.mark.parametrize("cut", CUT_DATES)
+@pytest.mark.parametrize("feed", ["cumulative", "daily"])
+def test_update_results_matches_full_recompute(synthetic_workbook, request, indice, country, frequency, weighting,
+                                               cut, feed):
+    expected = mi.get_results("SPX", indice, country, frequency, weighting)
+    expected_costs = mi.get_index_costs("SPX", indice, country, frequency, weighting, "bps", 10.0)
+    source_cache = os.path.abspath(os.path.join(donnees.CACHE_DIR, donnees.get_workbook_key()))
+
+    request.getfixturevalue("workdir")
+    df_new_prices = make_truncated_workbook(source_cache, "SPX", cut)
+    mi.get_results("SPX", indice, country, frequency, weighting)
+
+    # Fichier cumulatif (toutes les dates depuis le classeur) ou fichiers successifs des seules nouvelles dates
+    mi.update_results("SPX", indice, df_new_prices.iloc[:3], country, frequency, weighting)
+    df_feed = df_new_prices if feed == "cumulative" else df_new_prices.iloc[3:]
+    updated = mi.update_results("SPX", indice, df_feed, country, frequency, weighting)
+
+    # Chaque mise à jour n'enregistre que ses nouvelles lignes, relues à la suite des résultats
+    results_path, _ = mi.get_results_path("SPX", indice, country, frequency, weighting)
+    assert mi.get_update_names(results_path) == ["000001", "000002"]
+    results = mi.get_results("SPX", indice, country, frequency, weighting)
+
+    for df_index_currencies in [updated.index, results.index]:
+        pd.testing.assert_index_equal(df_index_currencies.index, expected.index.index)
+        np.testing.assert_allclose(df_index_currencies, expected.index, rtol=1e-9)
+    np.testing.assert_allclose(
+        results.weights, expected.weights.reindex(columns=results.weights.columns, fill_value=0.0), rtol=1e-9
+    )
+    np.testing.assert_allclose(results.indicators, expected.indicators, rtol=1e-9, atol=1e-12)
+
+    # Rotation et indice net de coûts déduits des résultats enregistrés, y compris sur les dates mises à jour
+    for df_costs, df_expected_costs in zip(
+        mi.get_index_costs("SPX", indice, country, frequency, weighting, "bps", 10.0), expected_costs
+    ):
+        pd.testing.assert_index_equal(df_costs.index, df_expected_costs.index)
+        np.testing.assert_allclose(df_costs, df_expected_costs, rtol=1e-9)
+
+
+# Stratégies de l'application écrites sous forme de règles, avec le même calendrier de rebalancement
+RULE_SPECS = {
+    "High vol PER": dict(mi.HIGH_VOL_PER_RULES, name="High vol PER (règles)"),
+    "Momentum 6 months": dict(
+        mi.MOMENTUM_RULES, name="Momentum 6 months (règles)",
+        rebalancing={"frequency": "semi-annual", "lookback": 1, "gap": 1, "lookback_by_frequency": mi.MOMENTUM_LOOKBACK}
+    ),
+    "Géographique": {
+        "name": "Géographique (règles)", "select": {"field": "COUNTRY", "in": ["FRANCE"]}, "weight": "CUR_MKT_CAP"
+    },
+}
+
+
+@pytest.fixture
+def rule_specs():
+    names = {indice: mi.register_strategy_spec(spec) for indice, spec in RULE_SPECS.items()}
+
+    yield names
+
+    for name in names.values():
+        mi.STRATEGY_SPECS.pop(name)
+
+
+@pytest.mark.parametrize("indice", list(RULE_SPECS))
+@pytest.mark.parametrize("frequency", [None, "semi-annual", "quarterly", "monthly"])
+def test_rule_specs_match_strategies(synthetic_workbook, rule_specs, indice, frequency):
+    country = "FRANCE" if indice == "Géographique" else None
+    expected_values, expected_weights = mi.get_index_values("SPX", indice, country, frequency)
+    df_index_values, df_weights_periods = mi.get_index_values("SPX", rule_specs[indice], None, frequency)
+
+    pd.testing.assert_index_equal(df_index_values.index, expected_values.index)
+    np.testing.assert_allclose(df_index_values, expected_values, rtol=1e-12)
+    np.testing.assert_allclose(
+        df_weights_periods, expected_weights.reindex(columns=df_weights_periods.columns), rtol=1e-12
+    )
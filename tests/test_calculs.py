@@ -0,0 +1,51 @@
+"""
+Tests des conversions de devises
+
+Les données Forex donnent la valeur d'un euro dans chaque devise : un prix en dollars est converti en livres par le
+taux croisé EURGBP / EURUSD du dernier cours connu à chaque date.
+"""
+
+import numpy as np
+import pandas as pd
+
+import moteur_indices as mi
+
+# Taux de change : valeur d'un euro en dollars, livres, yens et yuans (pas de cours le 3 janvier)
+FOREX = pd.DataFrame({
+    "EURUSD": [1.20, 1.25, 1.10],
+    "EURGBP": [0.90, 0.80, 0.88],
+    "EURJPY": [130.0, 131.0, 132.0],
+    "EURCNY": [7.8, 7.9, 8.0],
+}, index=pd.to_datetime(["2021-01-01", "2021-01-02", "2021-01-04"]))
+
+DATES = pd.to_datetime(["2021-01-01", "2021-01-02", "2021-01-03", "2021-01-04"])
+
+
+def test_convert_prices_eur_gbp_cross_rate():
+    df_prices = pd.DataFrame({"A": [100.0, 50.0, 40.0, 22.0], "B": [10.0, 20.0, 30.0, 11.0]}, index=DATES)
+
+    # 100 USD = 100 / 1.20 EUR = 75 GBP ; le 3 janvier reprend les cours du 2 janvier
+    expected = pd.DataFrame({
+        "A": [75.0, 32.0, 25.6, 17.6],
+        "B": [7.5, 12.8, 19.2, 8.8],
+    }, index=DATES)
+
+    df_gbp = mi.convert_prices(df_prices, FOREX, "GBP")
+    pd.testing.assert_index_equal(df_gbp.index, DATES)
+    np.testing.assert_allclose(df_gbp, expected)
+    np.testing.assert_allclose(mi.convert_prices(df_prices, FOREX, "EUR")["B"], df_prices["B"] / [1.2, 1.25, 1.25, 1.1])
+
+    # Série : une colonne du nom de la série, sans les dates sans prix
+    df_series = mi.convert_prices(df_prices["A"].where(DATES != "2021-01-04"), FOREX, "GBP")
+    assert list(df_series.columns) == ["A"]
+    np.testing.assert_allclose(df_series["A"], [75.0, 32.0, 25.6])
+
+
+def test_cross_rates_are_consistent():
+    rates = mi.get_cross_rates(FOREX, DATES)
+    gbp, usd, eur = (mi.CURRENCIES.index(currency) for currency in ["GBP", "USD", "EUR"])
+
+    np.testing.assert_allclose(rates[:, usd, gbp], [0.75, 0.64, 0.64, 0.8])
+    np.testing.assert_allclose(rates[:, gbp, usd] * rates[:, usd, gbp], 1.0)
+    np.testing.assert_allclose(rates[:, eur, gbp] * rates[:, gbp, usd], rates[:, eur, usd])
+    np.testing.assert_allclose(np.diagonal(rates, axis1=1, axis2=2), 1.0)
@@ -0,0 +1,39 @@
+"""
+Tests de la collecte des données
+
+Lecture point-in-time des données qualitatives : un champ garde le même type sur toutes les années, même lorsque ses
+valeurs d'une année ne sont que des marqueurs d'erreur du classeur.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import moteur_indices as mi
+from moteur_indices import donnees
+from synthetique import make_synthetic_workbook
+
+
+# Champ numérique dont les valeurs d'une année sont toutes des marqueurs d'erreur : la feuille de cette année le garde
+# en texte, mais les autres années restent lues comme des nombres
+def test_qualitative_field_typed_across_years(workdir):
+    make_synthetic_workbook(20, 4, seed=1)
+    cache_path = os.path.join(donnees.CACHE_DIR, donnees.get_workbook_key())
+    sheet_path = os.path.join(cache_path, f"{donnees.QUALITATIVE_PREFIX}2019.parquet")
+    df_sheet = pd.read_parquet(sheet_path)
+    df_sheet["PE_RATIO"] = "#N/A N/A"
+    df_sheet.to_parquet(sheet_path, index=False)
+
+    qualitative_store = mi.get_qualitative_store()
+    df_2018 = pd.read_parquet(os.path.join(cache_path, f"{donnees.QUALITATIVE_PREFIX}2018.parquet"))
+    tickers = df_2018["Ticker"].tolist()
+
+    pe_ratios = mi.get_qualitative_as_of_dates(qualitative_store, ["2018-06-01", "2019-06-01"], "PE_RATIO", tickers)
+    assert "PE_RATIO" not in qualitative_store.texts
+    np.testing.assert_array_equal(pe_ratios[0], df_2018["PE_RATIO"].to_numpy())
+    assert np.isnan(pe_ratios[1]).all()
+
+    # Les champs textuels restent textuels
+    countries = mi.get_qualitative_as_of_dates(qualitative_store, ["2018-06-01"], "COUNTRY", tickers)
+    assert countries[0].tolist() == df_2018["COUNTRY"].tolist()
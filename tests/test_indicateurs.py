@@ -0,0 +1,48 @@
+"""
+Tests des indicateurs de performance
+
+Le beta et l'alpha, calculés par la formule fermée de la régression linéaire, sont comparés à une régression des
+moindres carrés (statsmodels) des rendements de chaque série sur ceux de la référence, sur leurs dates communes.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import moteur_indices as mi
+
+
+# Fonction qui crée des séries de prix corrélées à une référence, avec des prix manquants à des dates différentes
+def make_series(seed, n_dates=500, n_series=4, missing=0.05):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2019-01-01", periods=n_dates)
+    reference_returns = rng.normal(0.0003, 0.01, n_dates)
+    betas = rng.uniform(0.3, 1.5, n_series)
+    returns = reference_returns[:, None] * betas + rng.normal(0.0002, 0.008, (n_dates, n_series))
+
+    prices = 100 * np.cumprod(1 + returns, axis=0)
+    prices[rng.random(prices.shape) < missing] = np.nan
+    reference_prices = 100 * np.cumprod(1 + reference_returns)
+    reference_prices[rng.random(n_dates) < missing] = np.nan
+
+    return pd.DataFrame(prices, index=dates), pd.Series(reference_prices, index=dates)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_beta_alpha_match_ols(seed):
+    sm = pytest.importorskip("statsmodels.api")
+    df_indices, df_reference = make_series(seed)
+    df_indicators = mi.compute_indicators(df_indices, df_reference)
+
+    # Rendements de chaque série et de la référence sur les dates où les deux existent
+    df_reference_returns = df_reference.pct_change(fill_method=None)
+    for column in df_indices.columns:
+        df_returns = pd.concat(
+            [df_indices[column].pct_change(fill_method=None), df_reference_returns], axis=1
+        ).dropna()
+        model = sm.OLS(df_returns.iloc[:, 0], sm.add_constant(df_returns.iloc[:, 1])).fit()
+
+        np.testing.assert_allclose(df_indicators.loc[column, "Beta"], model.params.iloc[1], rtol=1e-10)
+        np.testing.assert_allclose(
+            df_indicators.loc[column, "Alpha"], model.params.iloc[0] * mi.TRADING_DAYS, rtol=1e-8, atol=1e-14
+        )
@@ -0,0 +1,74 @@
+"""
+Tests des schémas de pondération
+
+Le portefeuille de variance minimale sans vente à découvert, calculé en lot par la méthode d'ensemble actif, est
+comparé à la solution d'un solveur de programmation quadratique (SLSQP) période par période.
+"""
+
+import numpy as np
+import pytest
+
+import moteur_indices as mi
+
+
+# Fonction qui crée un lot de rendements (périodes x dates x titres) de titres aux volatilités et aux expositions à un
+# facteur commun très différentes, pour que la contrainte de poids positifs soit active, avec des sélections de tailles
+# différentes complétées par des zéros
+def make_returns_batch(seed, n_periods=6, n_dates=120, n_max=25):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(3, n_max + 1, n_periods)
+    sizes[0] = n_max
+    mask = np.arange(n_max)[None, :] < sizes[:, None]
+
+    factor = rng.normal(0, 0.01, (n_periods, n_dates, 1))
+    exposures = rng.uniform(-0.5, 2.0, (n_periods, 1, n_max))
+    volatilities = rng.uniform(0.005, 0.04, (n_periods, 1, n_max))
+    returns = (factor * exposures + rng.normal(0, 1, (n_periods, n_dates, n_max)) * volatilities) * mask[:, None, :]
+
+    return returns, np.full(n_periods, n_dates), mask
+
+
+# Fonction qui résout min w'Σw sous somme(w) = 1 et 0 <= w <= 1 par SLSQP
+def solve_minimum_variance(covariance):
+    optimize = pytest.importorskip("scipy.optimize")
+    n = len(covariance)
+    solution = optimize.minimize(
+        lambda w: w @ covariance @ w, np.full(n, 1 / n), jac=lambda w: 2 * covariance @ w, method="SLSQP",
+        bounds=[(0.0, 1.0)] * n, constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1}],
+        options={"ftol": 1e-16, "maxiter": 1000}
+    )
+    assert solution.success
+
+    return solution.x
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_minimum_variance_matches_quadratic_solver(seed):
+    returns, counts, mask = make_returns_batch(seed)
+    weights = mi.minimum_variance_weights(None, returns, counts, mask)
+    covariance = mi.get_shrunk_covariance(returns, counts, mask)
+
+    assert (weights >= 0).all() and not weights[~mask].any()
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    n_excluded = 0
+    for row in range(len(mask)):
+        n = mask[row].sum()
+        period_covariance = covariance[row, :n, :n]
+        expected = solve_minimum_variance(period_covariance)
+
+        # Même variance (au plus celle du solveur) et mêmes poids à la précision du solveur
+        variance = weights[row, :n] @ period_covariance @ weights[row, :n]
+        expected_variance = expected @ period_covariance @ expected
+        assert expected_variance * (1 - 1e-8) <= variance <= expected_variance * (1 + 1e-12)
+        np.testing.assert_allclose(weights[row, :n], expected, atol=1e-4)
+
+        # Conditions d'optimalité exactes : contribution marginale à la variance égale pour les titres détenus, au
+        # moins égale pour les titres exclus
+        marginal = period_covariance @ weights[row, :n]
+        held = weights[row, :n] > 0
+        np.testing.assert_allclose(marginal[held], variance, rtol=1e-9)
+        assert (marginal[~held] >= variance * (1 - 1e-9)).all()
+        n_excluded += (~held).sum()
+
+    # La contrainte de poids positifs est active dans le lot
+    assert n_excluded > 0
@@ -0,0 +1,24 @@
+"""
+Tests du pool de processus de calcul
+
+Les processus créés sans fork (spawn, sous Windows et macOS) doivent lire le même classeur et connaître les mêmes
+stratégies définies par des règles que le processus principal.
+"""
+
+import moteur_indices as mi
+from moteur_indices import donnees, sweep
+
+
+def test_spawned_workers_use_main_process_workbook(workdir, monkeypatch):
+    monkeypatch.setattr(donnees, "EXCEL_FILE", "autre_classeur.xlsx")
+    open(donnees.EXCEL_FILE, "w").close()
+    spec = {"name": "Règles du processus principal", "select": {"field": "COUNTRY", "in": ["FRANCE"]}}
+    name = mi.register_strategy_spec(spec)
+    monkeypatch.setattr(sweep.multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+
+    try:
+        with sweep.get_process_pool(1) as executor:
+            assert executor.submit(mi.get_workbook_key).result() == mi.get_workbook_key()
+            assert name in executor.submit(mi.get_indices).result()
+    finally:
+        mi.STRATEGY_SPECS.pop(name)